@@ -0,0 +1,149 @@
+# microbenchmarks for the hot helper functions, run from the folder with the dataset:
+#     python benchmark.py [name ...]
+# each benchmark prints the time of the original implementation next to the current one
+
+import contextlib
+import io
+import re
+import sys
+import time
+from datetime import datetime
+
+import constants
+import utils
+from special_character_map import CHARACTER_MAP
+
+
+def best_time(func, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label: str, count: int, seconds: float):
+    print(f"  {label:<28} {seconds * 1000:9.1f} ms  {count / seconds:14,.0f} /s")
+
+
+# the character loop normalize_name used before the translation table
+def normalize_name_loop(name: str) -> str:
+    out = ""
+    for ch in name:
+        try:
+            ch = CHARACTER_MAP[ch]
+        except KeyError:
+            pass
+        out += ch
+    return out
+
+
+# normalize_name over the "name" column of the full athlete bio file
+def bench_names():
+    bios = utils.read_csv_file(constants.OLYMPIC_PATHS.ATHLETE_BIO)
+    names = [row[1] for row in bios[1:]]
+    print(f"normalize_name: {len(names)} names, {len(set(names))} distinct")
+
+    def cold():
+        utils.normalize_name_cached.cache_clear()
+        for name in names:
+            utils.normalize_name(name)
+
+    def warm():
+        for name in names:
+            utils.normalize_name(name)
+
+    def batch():
+        utils.normalize_name_cached.cache_clear()
+        utils.normalize_names(names)
+
+    report("character loop", len(names), best_time(lambda: list(map(normalize_name_loop, names))))
+    report("translate (cold cache)", len(names), best_time(cold))
+    report("translate (warm cache)", len(names), best_time(warm))
+    report("normalize_names (batch)", len(names), best_time(batch))
+
+
+# the strptime trial loop normalize_date used before the date shape parsers
+def normalize_date_strptime(date_str: str, athlete_id: int | None = None) -> str:
+    output_format = "%d-%b-%Y"
+    date_str = date_str.strip()
+    if not date_str:
+        return ""
+
+    def predict_prefix(day: str, mon: str, year: str, athlete_id: int) -> str:
+        edition_year = utils.athlete_edition_map[str(athlete_id)]
+        prefix = 20
+        while int(edition_year) <= int(f"{prefix}{year}"):
+            prefix -= 1
+
+        return datetime.strptime(f"{day}-{mon}-{prefix}{year}", "%d-%b-%Y").strftime(
+            output_format
+        )
+
+    if date_str.isdigit() and len(date_str) == 4:
+        return datetime(int(date_str), 1, 1).strftime(output_format)
+
+    first_match_text = re.search(r"^(\d{1,2})-([A-Za-z]{3})-(\d{2})$", date_str)
+    if first_match_text and athlete_id is not None:
+        day, mon, year = first_match_text.groups()
+        return predict_prefix(day, mon, year, athlete_id)
+
+    second_match_text = re.search(r"^([A-Za-z]{3})-(\d{2})$", date_str)
+    if second_match_text and athlete_id is not None:
+        mon, year = second_match_text.groups()
+        return predict_prefix("01", mon, year, athlete_id)
+
+    formats = ["%d %B %Y", "%Y-%m-%d", "%d-%b-%Y", "%B %Y", "%b %d, %Y", "%d-%m-%Y"]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt).strftime(output_format)
+        except ValueError:
+            continue
+
+    matches = re.findall(r"\d{4}", date_str)
+    if len(matches) > 0:
+        return datetime(max([int(match) for match in matches]), 1, 1).strftime(
+            output_format
+        )
+    return ""
+
+
+# normalize_date over the "born" column of the full athlete bio file (the calls made by create_objects)
+def bench_dates():
+    games = utils.read_csv_file(constants.OLYMPIC_PATHS.GAMES)
+    results = utils.read_csv_file(constants.OLYMPIC_PATHS.EVENT_RESULTS)
+    utils.create_athlete_edition_id_map(results, games)
+    del results
+    bios = utils.read_csv_file(constants.OLYMPIC_PATHS.ATHLETE_BIO)
+    dates = [(row[3].strip(), row[0].strip()) for row in bios[1:]]
+    print(f"normalize_date: {len(dates)} dates, {len({date for date, _ in dates})} distinct")
+
+    def run(normalize):
+        for date, athlete_id in dates:
+            normalize(date, athlete_id)
+
+    def cold():
+        utils.parse_date.cache_clear()
+        utils.predict_date.cache_clear()
+        run(utils.normalize_date)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # "invalid date" messages
+        times = [
+            ("strptime loop", best_time(run, normalize_date_strptime)),
+            ("date shapes (cold cache)", best_time(cold)),
+            ("date shapes (warm cache)", best_time(run, utils.normalize_date)),
+        ]
+    for label, seconds in times:
+        report(label, len(dates), seconds)
+
+
+BENCHMARKS = {
+    "names": bench_names,
+    "dates": bench_dates,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
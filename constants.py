@@ -22,3 +22,125 @@ raw_paris_paths = {
     "TEAMS": "paris/teams.csv",
 }
 PARIS_PATHS = dotdict(raw_paris_paths)
+
+# project.main reads the files of each parse_data call at the same time (see jobs.parse_data_concurrent),
+# the large files are parsed in a separate process
+CONCURRENT_INGEST = True
+LARGE_FILES = {OLYMPIC_PATHS.ATHLETE_BIO, OLYMPIC_PATHS.EVENT_RESULTS}
+
+# on-disk cache of parsed csv files (see utils.iter_csv_file_cached), rows per chunk of a cache entry
+CSV_CACHE_DIR = ".csv_cache"
+CSV_CACHE_MAX_BYTES = 512 * 1024 * 1024
+CSV_CACHE_CHUNK_ROWS = 8192
+
+# buffer size used when writing the output csv files (see utils.write_csv_file)
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# zip archive of the whole dataset (including the paris/ folder) to read the input files from,
+# None reads them from the working directory
+DATASET_ARCHIVE = None
+
+# incremental processing of the event results (see jobs.process_event_results_incremental)
+INCREMENTAL_EVENT_RESULTS = False
+EVENT_RESULTS_MANIFEST = ".event_results_manifest"
+EVENT_RESULTS_MANIFEST_VERSION = 1
+
+# threads for the stages of project.main (see scheduler.StageScheduler),
+# STAGE_TIMINGS prints the start / end time of every stage after the run
+STAGE_WORKERS = 4
+STAGE_TIMINGS = False
+
+# worker processes for the rows of the large keyed files in jobs.create_objects (1 builds them in this process),
+# only worth it with spare cores, and rows per chunk sent to a worker
+OBJECT_WORKERS = 1
+SHARDED_OBJECT_FILES = {OLYMPIC_PATHS.ATHLETE_BIO}
+OBJECT_SHARD_SIZE = 8192
+
+# worker processes for the editions of the event results in jobs.process_event_results (1 processes them here)
+EVENT_RESULTS_WORKERS = 1
+
+# paris consistency checks (see jobs.validate_paris_consistency)
+# worker processes for the rule chunks (1 checks them in this process), rows per chunk,
+# offending values kept per rule, and the file name of the cached report (stored in CSV_CACHE_DIR)
+VALIDATION_WORKERS = 1
+VALIDATION_CHUNK_SIZE = 4096
+VALIDATION_SAMPLE_SIZE = 10
+PARIS_VALIDATION_MANIFEST = "paris_validation.manifest"
+PARIS_VALIDATION_MANIFEST_VERSION = 1
+
+# keep the event results in columns (see event_results_table.EventResultsTable)
+COLUMNAR_EVENT_RESULTS = True
+
+# memoized list values of the paris files (see utils.parse_list_value)
+LIST_VALUE_CACHE_SIZE = 1 << 14
+
+# athlete name normalization (see utils.normalize_name)
+# memoized names, the cache drops the least recently used names past this size
+NAME_CACHE_SIZE = 1 << 18
+# also strip accents from characters that are not in CHARACTER_MAP (ie "ő" -> "o"),
+# off by default since it changes the athlete keys of such names
+NAME_DECOMPOSITION_FALLBACK = False
+
+# memoized dates in utils.normalize_date (per distinct date string)
+DATE_CACHE_SIZE = 1 << 16
+
+# minimum trigram jaccard similarity of two athlete names to be linked as the same athlete
+# (see utils.FuzzyAthleteIndex, used with add_paris_objects(use_fuzzy_matching=True))
+FUZZY_MATCH_THRESHOLD = 0.8
+
+# historical / alternative NOC codes registered as aliases of a current code (see noc_registry.NocRegistry),
+# ie {"ROC": "RUS"}, codes with an alias are not added as new nocs from paris/nocs.csv
+NOC_ALIASES = {}
+
+# columns with a small set of values repeated over many rows, their values are interned while parsing
+# (see utils.intern_columns), project.main skips the event results when they are kept in an EventResultsTable
+# (its columns are already dictionary encoded, ids and positions are stored as ints)
+CATEGORICAL_COLUMNS = {
+    OLYMPIC_PATHS.ATHLETE_BIO: ["sex", "country", "country_noc"],
+    OLYMPIC_PATHS.EVENT_RESULTS: [
+        "edition",
+        "country_noc",
+        "sport",
+        "event",
+        "medal",
+        "isTeamSport",
+    ],
+    PARIS_PATHS.ATHLETES: [
+        "current",
+        "gender",
+        "function",
+        "country_code",
+        "country",
+        "country_long",
+        "nationality",
+        "nationality_full",
+        "nationality_code",
+        "disciplines",
+        "events",
+    ],
+    PARIS_PATHS.MEDALLISTS: [
+        "medal_type",
+        "medal_code",
+        "gender",
+        "country_code",
+        "country",
+        "country_long",
+        "nationality_code",
+        "nationality",
+        "nationality_long",
+        "discipline",
+        "event",
+        "event_type",
+    ],
+    PARIS_PATHS.TEAMS: [
+        "current",
+        "country_code",
+        "country",
+        "country_long",
+        "discipline",
+        "events",
+    ],
+}
+
+# event results columns read by the medal summary (jobs.create_summary), in the order they are unpacked
+SUMMARY_COLUMNS = ("edition", "edition_id", "country_noc", "event", "athlete_id", "medal")
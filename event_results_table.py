@@ -0,0 +1,192 @@
+from array import array
+from itertools import islice
+
+# columnar storage for olympic_athlete_event_results.csv (see EventResultsTable)
+
+# ids and positions are stored as 8 byte ints in an array instead of one str object per value
+INT_COLUMNS = {"edition_id", "result_id", "athlete_id", "pos", "age"}
+# columns with few distinct values are dictionary encoded, each row only stores the code of its value
+CATEGORY_COLUMNS = {"edition", "country_noc", "sport", "event", "medal", "isTeamSport"}
+
+# marks a row whose value is not a plain non-negative int (ie "", "=4", "DNS"),
+# the original value is kept in the column's "other" dict
+OTHER = -1
+
+
+# integer column, values that are not canonical non-negative ints are kept as-is so every value round trips
+class IntColumn:
+    def __init__(self):
+        self.values = array("q")
+        self.other = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value) -> int:
+        if type(value) is int and value >= 0:
+            return value
+        if (
+            type(value) is str
+            and value.isascii()
+            and value.isdigit()
+            and (value[0] != "0" or value == "0")
+        ):
+            return int(value)
+        return OTHER
+
+    def append(self, value):
+        code = self.encode(value)
+        if code == OTHER:
+            self.other[len(self.values)] = value
+        self.values.append(code)
+
+    # appends many values at once (same result as append for every value, without the per value call)
+    def extend(self, values):
+        other = self.other
+        codes = []
+        index = len(self.values)
+        for value in values:
+            if type(value) is str:
+                if (
+                    value.isdigit()
+                    and value.isascii()
+                    and (value[0] != "0" or value == "0")
+                ):
+                    codes.append(int(value))
+                    index += 1
+                    continue
+            elif type(value) is int and value >= 0:
+                codes.append(value)
+                index += 1
+                continue
+            other[index] = value
+            codes.append(OTHER)
+            index += 1
+        self.values.extend(codes)
+
+    def set(self, index: int, value):
+        code = self.encode(value)
+        if code == OTHER:
+            self.other[index] = value
+        else:
+            self.other.pop(index, None)
+        self.values[index] = code
+
+    # returns every value of the column, ints come back as strings (the way they are read from the csv)
+    def decode(self) -> list:
+        out = list(map(str, self.values))
+        for index, value in self.other.items():
+            out[index] = value
+        return out
+
+
+# dictionary encoded column, each distinct value is stored once
+class CategoryColumn:
+    def __init__(self):
+        self.codes = array("I")
+        self.categories = []
+        self.index = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.index[value] = code
+        self.codes.append(code)
+
+    def extend(self, values):
+        values = list(values)
+        for value in values:
+            if value not in self.index:
+                self.index[value] = len(self.categories)
+                self.categories.append(value)
+        self.codes.extend(map(self.index.__getitem__, values))
+
+    def set(self, index: int, value):
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.index[value] = code
+        self.codes[index] = code
+
+    def decode(self) -> list:
+        return list(map(self.categories.__getitem__, self.codes))
+
+
+# plain column for values that are mostly unique (ie athlete names)
+class ListColumn(list):
+    def set(self, index: int, value):
+        self[index] = value
+
+    def decode(self) -> list:
+        return self
+
+
+def make_column(name: str):
+    if name in INT_COLUMNS:
+        return IntColumn()
+    if name in CATEGORY_COLUMNS:
+        return CategoryColumn()
+    return ListColumn()
+
+
+# column based replacement for the event results list of lists
+# the header decides the type of every column, rows (lists) are only rebuilt when the table is written out (iter_rows)
+# indexing a column by position matches the row indices used in jobs.py (ie 1 = edition_id, 7 = athlete_id)
+class EventResultsTable:
+    def __init__(self, header: list[str]):
+        self.header = list(header)
+        self.columns = [make_column(name) for name in self.header]
+
+    # builds a table from rows where the first row is the header (ie the output of utils.read_csv_file)
+    # rows can be a lazy iterator (utils.iter_csv_file), they are added in chunks so the full list of rows
+    # never has to exist next to the table
+    @classmethod
+    def from_rows(cls, rows, chunk_size: int = 65536) -> "EventResultsTable":
+        rows = iter(rows)
+        table = cls(next(rows))
+        while chunk := list(islice(rows, chunk_size)):
+            table.extend(chunk)
+        return table
+
+    # number of rows including the header row, the same as len() of the list of rows the table replaces
+    def __len__(self) -> int:
+        return (len(self.columns[0]) if self.columns else 0) + 1
+
+    # appends rows (lists of values in header order), the rows are split into their columns in one pass per column
+    # ragged rows (ie a csv line with a missing trailing field) are padded with "" up to the header width,
+    # values past the last header column are dropped since there is no column to keep them in
+    def extend(self, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        width = len(self.columns)
+        if any(len(row) != width for row in rows):
+            rows = [row if len(row) == width else (list(row) + [""] * width)[:width] for row in rows]
+        for i, column in enumerate(self.columns):
+            column.extend([row[i] for row in rows])
+
+    # returns every value of a column (by index), in row order
+    def column_values(self, index: int) -> list:
+        return self.columns[index].decode()
+
+    # adds a new column at the end of the table, values are in row order
+    def add_column(self, name: str, values):
+        column = make_column(name)
+        column.extend(values)
+        if len(column) != len(self) - 1:
+            raise ValueError(
+                f"column {name} has {len(column)} values, expected {len(self) - 1}"
+            )
+        self.header.append(name)
+        self.columns.append(column)
+
+    # yields the header and then every row as a list (for utils.write_csv_file)
+    def iter_rows(self):
+        yield self.header
+        columns = [column.decode() for column in self.columns]
+        for row in zip(*columns):
+            yield list(row)
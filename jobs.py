@@ -1,38 +1,162 @@
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from itertools import chain, islice
+import io
+import os
 import re
-import ast
+import sys
 
 
 import utils
 import constants
 from event_map import EVENT_MAP
+from event_results_table import OTHER, EventResultsTable
+from noc_registry import NocRegistry
+from records import make_fields_getter, make_record_type
+from schema import Schema
+import validation
 
 
 # accepts a list of filenames for csv data
 # returns a list of dictionaries with the following structure: {filename: [[string]]}
-def parse_data(filenames: list[str]) -> dict[str, list[list[str]]]:
-    data = {}
-    for name in filenames:
-        data[name] = utils.read_csv_file(name)
+# filenames listed in lazy_files are returned as row iterators instead of lists (utils.iter_csv_file),
+# only use this for files that are scanned once (ie consumed by create_objects)
+# with concurrent=True the files are read at the same time, see parse_data_concurrent
+# with use_cache=True unchanged files are loaded from the parsed file cache, lazy files stream their rows
+# from it, see utils.iter_csv_file_cached
+# with archive set the files are read from inside that zip archive, otherwise compressed copies
+# (.gz / .xz / .bz2) are picked up when the plain csv is missing. The keys are always the given filenames
+# categorical_columns ({filename: [column name]}) lists the columns whose repeated values are interned
+# into one shared copy (utils.string_pool)
+# the schema of every file is registered from its header row (utils.schemas)
+def parse_data(
+    filenames: list[str],
+    lazy_files: set[str] | None = None,
+    concurrent: bool = False,
+    use_cache: bool = False,
+    archive: str | None = None,
+    categorical_columns: dict[str, list[str]] | None = None,
+) -> dict[str, list[list[str]] | Iterator[list[str]]]:
+    if concurrent:
+        data = parse_data_concurrent(
+            filenames, lazy_files, use_cache=use_cache, archive=archive
+        )
+    else:
+        read_file = utils.read_csv_file_cached if use_cache else utils.read_csv_file
+        iter_file = utils.iter_csv_file_cached if use_cache else utils.iter_csv_file
+        data = {}
+        for name in filenames:
+            path = utils.find_input_file(name, archive)
+            if lazy_files and name in lazy_files:
+                data[name] = iter_file(path)
+            else:
+                data[name] = read_file(path)
+
+    if categorical_columns:
+        for name in data:
+            if name not in categorical_columns:
+                continue
+            if isinstance(data[name], list):
+                utils.intern_columns(data[name], categorical_columns[name])
+            else:
+                data[name] = utils.iter_interned(data[name], categorical_columns[name])
+
+    for name in data:
+        if isinstance(data[name], list):
+            if len(data[name]):
+                utils.register_schema(name, data[name][0])
+        else:
+            # lazy files: the header row is read ahead and put back in front of the rows
+            rows = iter(data[name])
+            header = next(rows, None)
+            if header is not None:
+                utils.register_schema(name, header)
+                rows = chain([header], rows)
+            data[name] = rows
+    return data
+
+
+# reads all of the files at once and returns the same {filename: [[string]]} mapping as parse_data
+# large files (constants.LARGE_FILES by default) are tokenized in worker processes since csv parsing holds the GIL,
+# the small files (ie paris tables) are read on threads as they are mostly file I/O
+# with use_cache=True the workers only parse the large files into the parsed file cache, the parent then loads
+# the rows from the cache entries (lazy files stream them), so no rows are pickled between the processes
+# without the cache the rows read in a worker process have to be pickled back to the parent (lazy large files
+# are then returned as lists), that only pays off when there are spare cores and the files are large enough
+def parse_data_concurrent(
+    filenames: list[str],
+    lazy_files: set[str] | None = None,
+    process_files: set[str] | None = None,
+    max_workers: int | None = None,
+    use_cache: bool = False,
+    archive: str | None = None,
+) -> dict[str, list[list[str]] | Iterator[list[str]]]:
+    if process_files is None:
+        process_files = constants.LARGE_FILES
+    filenames = list(filenames)
+    lazy_files = lazy_files or set()
+    read_file = utils.read_csv_file_cached if use_cache else utils.read_csv_file
+    iter_file = utils.iter_csv_file_cached if use_cache else utils.iter_csv_file
+
+    futures = {}
+    cached_files = set()  # files a worker parsed into the cache, the rows are read from the returned entry
+    with ProcessPoolExecutor(max_workers=max_workers) as process_pool, ThreadPoolExecutor(
+        max_workers=max_workers
+    ) as thread_pool:
+        for name in filenames:
+            path = utils.find_input_file(name, archive)
+            if name in process_files and use_cache:
+                futures[name] = process_pool.submit(utils.cache_csv_file, path)
+                cached_files.add(name)
+            elif name in process_files:
+                futures[name] = process_pool.submit(read_file, path)
+            elif name not in lazy_files:
+                futures[name] = thread_pool.submit(read_file, path)
+
+        # keeping the same key order as the serial parse_data
+        data = {}
+        for name in filenames:
+            path = utils.find_input_file(name, archive)
+            if name in cached_files:
+                read_entry = iter_file if name in lazy_files else read_file
+                data[name] = read_entry(path, entry=futures[name].result())
+            elif name in futures:
+                data[name] = futures[name].result()
+            else:
+                data[name] = iter_file(path)
     return data
 
 
 # adds missing nocs from paris to olympic + sorts and cleans
-def combine_nocs(olympic: list[list[str]], paris: list[list[str]]):
-    noc_idx = 0
-    olympic_country_idx = 1
-    paris_country_idx = 2
-    olympic_nocs = []
+# adds the paris nocs missing from the olympic country rows and fills the shared noc registry (utils.noc_registry)
+# that the later stages look the codes up in
+def combine_nocs(olympic: list[list[str]], paris: list[list[str]]) -> NocRegistry:
+    olympic_schema = utils.get_schema(constants.OLYMPIC_PATHS.COUNTRY, olympic)
+    paris_schema = utils.get_schema(constants.PARIS_PATHS.NOCS, paris)
+    noc_idx = olympic_schema.index("noc")
+    olympic_country_idx = olympic_schema.index("country")
+    paris_noc = paris_schema.extractor("code", "country_long")
+    noc_registry = utils.noc_registry
+    noc_registry.clear()
     for row in olympic[1:]:
-        olympic_nocs.append(row[noc_idx].lower())
         row[noc_idx] = row[noc_idx].upper()
+        # stripped like the values of the country objects (create_objects)
+        noc_registry.add(row[noc_idx].strip(), row[olympic_country_idx].strip())
+
+    for alias, code in constants.NOC_ALIASES.items():
+        noc_registry.add_alias(alias, code)
 
-    for row in paris[1:]:
-        if row[noc_idx].lower() not in olympic_nocs:
-            olympic.append([row[noc_idx].upper(), row[paris_country_idx]])
-            print("added noc:", row[noc_idx].upper(), row[paris_country_idx])
+    for code, country in map(paris_noc, paris[1:]):
+        if code not in noc_registry:
+            olympic.append(olympic_schema.make_row({"noc": code.upper(), "country": country}))
+            noc_registry.add(code.upper().strip(), country.strip())
+            print("added noc:", code.upper(), country)
 
     olympic[1:] = sorted(olympic[1:], key=lambda x: x[olympic_country_idx])
+    return noc_registry
 
 
 # accepts data in format: {filename: [[value, ...]]}
@@ -45,25 +169,67 @@ def combine_nocs(olympic: list[list[str]], paris: list[list[str]]):
 #     }
 # }
 # for files which require this format, other files are kept the same (ie event results can stay a list)
+# the rows of a file can also be a lazy row iterator (see parse_data), they are consumed in a single pass
+# with use_records=True every row becomes a __slots__ record built from the csv header (see records.py)
+# instead of a dict, records are used the same way as the dicts but take a fraction of the memory
+# with workers > 1 (constants.OBJECT_WORKERS by default) the rows of the files in constants.SHARDED_OBJECT_FILES
+# are stripped, date normalized and keyed in worker processes (see create_object_values), the objects are
+# still built and keyed in row order here, so repeated keys get the same "TEMP" suffixes as a serial run
 def create_objects(
-    data: dict[str, list[list[str]]], unique_id_columns: dict[str, list[str]]
+    data: dict[str, list[list[str]]],
+    unique_id_columns: dict[str, list[str]],
+    use_records: bool = True,
+    workers: int | None = None,
 ) -> dict[str, dict[str, dict[str, str]] | list[list[str]]]:
+    if workers is None:
+        workers = constants.OBJECT_WORKERS
     ret = {}
     for filename in data:
         if filename in unique_id_columns:
-            csv = data[filename]
+            rows = iter(data[filename])
             birth_column = None
             if filename == constants.PARIS_PATHS.ATHLETES:
                 birth_column = "birth_date"
             elif filename == constants.OLYMPIC_PATHS.ATHLETE_BIO:
                 birth_column = "born"
-            headers = csv[0]
+            headers = next(rows)
+            if use_records:
+                record_type = make_record_type(
+                    "Record_" + filename.replace("/", "_").replace(".", "_"), headers
+                )
             filedata = {}
-            for row in csv[1:]:
-                row_object = {}
-                for i in range(len(row)):
-                    value = row[i].strip()
-                    row_object[headers[i]] = value
+            if workers > 1 and filename in constants.SHARDED_OBJECT_FILES:
+                for identifier, values, printed in create_object_values_sharded(
+                    rows,
+                    workers,
+                    (
+                        headers,
+                        birth_column,
+                        unique_id_columns[filename],
+                        filename == constants.PARIS_PATHS.ATHLETES,
+                        utils.athlete_edition_map,
+                    ),
+                ):
+                    if printed:
+                        print(printed, end="")  # messages of the row, ie "invalid date"
+                    if use_records:
+                        row_object = record_type(values)
+                    else:
+                        row_object = dict(zip(headers, values))
+                    while identifier in filedata:
+                        print("hit repeat, adding temp on key:", filedata[identifier])
+                        identifier += "TEMP"
+                    filedata[identifier] = row_object
+                ret[filename] = filedata
+                continue
+            for row in rows:
+                if use_records:
+                    row_object = record_type([value.strip() for value in row])
+                else:
+                    row_object = {}
+                    for i in range(len(row)):
+                        value = row[i].strip()
+                        row_object[headers[i]] = value
 
                 if birth_column:
                     row_object[birth_column] = utils.normalize_date(
@@ -80,12 +246,68 @@ def create_objects(
                     identifier += "TEMP"
                 filedata[identifier] = row_object
             ret[filename] = filedata
-        else:
+        elif isinstance(data[filename], (list, EventResultsTable)):
             ret[filename] = data[filename]
+        else:
+            ret[filename] = list(data[filename])
 
     return ret
 
 
+# yields (identifier, values, printed) for every row, in row order, the rows are split into chunks of
+# constants.OBJECT_SHARD_SIZE that are processed by workers processes (see create_object_values)
+# settings is (headers, birth column, unique id columns, is paris file, athlete edition map)
+def create_object_values_sharded(rows, workers: int, settings: tuple):
+    for chunk in utils.map_chunks(
+        create_object_values,
+        rows,
+        constants.OBJECT_SHARD_SIZE,
+        workers,
+        initializer=init_object_worker,
+        initargs=settings,
+    ):
+        yield from chunk
+
+
+# settings of create_object_values in a worker process, set once per worker
+object_worker_settings = ()
+
+
+def init_object_worker(headers, birth_column, id_columns, is_paris, athlete_edition_map):
+    global object_worker_settings
+    object_worker_settings = (headers, birth_column, id_columns, is_paris)
+    # normalize_date predicts the century of two digit birth years from the athlete's first edition
+    utils.athlete_edition_map.update(athlete_edition_map)
+
+
+# the per row work of create_objects for a chunk of rows (run in a worker process):
+# returns (identifier, stripped values with the normalized birth date, what was printed for the row) per row
+def create_object_values(rows: list[list[str]]) -> list[tuple]:
+    headers, birth_column, id_columns, is_paris = object_worker_settings
+    birth_idx = headers.index(birth_column) if birth_column in headers else None
+    out = []
+    stdout = sys.stdout
+    sys.stdout = buffer = io.StringIO()
+    try:
+        for row in rows:
+            values = [value.strip() for value in row]
+            row_object = dict(zip(headers, values))
+            if birth_column:
+                values[birth_idx] = row_object[birth_column] = utils.normalize_date(
+                    row_object[birth_column], row_object.get("athlete_id", None)
+                )
+            identifier = utils.create_unique_id(row_object, id_columns, is_paris)
+            printed = None
+            if buffer.tell():
+                printed = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            out.append((identifier, values, printed))
+    finally:
+        sys.stdout = stdout
+    return out
+
+
 # accepts the paris data and accepts the olympic data
 # Pulls together information from different paris files to create olympic style
 # python objects, and adds them to the total data
@@ -104,12 +326,25 @@ def add_paris_objects(
     remove_duplicate_team_events: bool = False,
     exclude_inactive_athletes: bool = False,
     exclude_not_found_athletes: bool = False,
+    use_fuzzy_matching: bool = False,
 ) -> None:
     new_athletes = {}
     paris_athletes = paris_data[constants.PARIS_PATHS.ATHLETES]
     olympic_athletes = olympic_data[constants.OLYMPIC_PATHS.ATHLETE_BIO]
-    olympic_nocs = olympic_data[constants.OLYMPIC_PATHS.COUNTRY]
+    noc_registry = utils.noc_registry or NocRegistry.from_countries(
+        olympic_data[constants.OLYMPIC_PATHS.COUNTRY]
+    )
+    # the new athletes are added to the athlete id index as they are created
+    utils.ensure_athlete_index(olympic_athletes)
     paris_athlete_local_map = {}
+    if use_name_permutations:
+        # each athlete is matched with a few lookups instead of one per permutation of its surnames
+        name_index = utils.NameTokenIndex(olympic_athletes)
+    if use_fuzzy_matching:
+        # athletes not found by key are linked to the most similar athlete with the same noc, sex and birth year
+        fuzzy_index = utils.FuzzyAthleteIndex(
+            olympic_athletes, constants.FUZZY_MATCH_THRESHOLD
+        )
 
     # helper for position formatting
     def format_position(position):
@@ -117,32 +352,30 @@ def add_paris_objects(
 
     new_event_results = []
     paris_medallists = paris_data[constants.PARIS_PATHS.MEDALLISTS]
-    medallist_header = paris_medallists[0]
-
-    event_idx = medallist_header.index("event")
-    sport_idx = medallist_header.index("discipline")
-    athlete_code_idx = medallist_header.index("code_athlete")
-    pos_idx = medallist_header.index("medal_code")
-    medal_type_idx = medallist_header.index("medal_type")
-    team_code_idx = medallist_header.index("code_team")
+    medallist_values = utils.get_schema(
+        constants.PARIS_PATHS.MEDALLISTS, paris_medallists
+    ).extractor(
+        "code_athlete", "event", "discipline", "code_team", "medal_type", "medal_code"
+    )
 
     medallist_map = {}
     # iterate over the medallists to create team/indiv medallist maps
-    for row in paris_medallists[1:]:
-        indiv_key = f"{row[athlete_code_idx]} {row[event_idx]} {row[sport_idx]}"
-        team_key = row[team_code_idx]
+    for athlete_code, event, sport, team_key, medal_type, position in map(
+        medallist_values, paris_medallists[1:]
+    ):
+        indiv_key = f"{athlete_code} {event} {sport}"
 
         if team_key == "":
             if indiv_key not in medallist_map:
                 medallist_map[indiv_key] = {
-                    "medal": row[medal_type_idx].split(" ")[0],
-                    "pos": format_position(row[pos_idx]),
+                    "medal": medal_type.split(" ")[0],
+                    "pos": format_position(position),
                 }
         else:
             if team_key not in medallist_map:
                 medallist_map[team_key] = {
-                    "medal": row[medal_type_idx].split(" ")[0],
-                    "pos": format_position(row[pos_idx]),
+                    "medal": medal_type.split(" ")[0],
+                    "pos": format_position(position),
                 }
 
     #  adding and formatting all paris athletes
@@ -156,10 +389,8 @@ def add_paris_objects(
         split_key = key.split(",")
         split_name = split_key[0].split(" ")
         if use_name_permutations:
-            names = utils.get_name_permutations(split_name)
-            potential_matches = [
-                ",".join([name] + [sk for sk in split_key[1:]]) for name in names
-            ]
+            match = name_index.find(key)
+            potential_matches = [match] if match is not None else []
         else:
             potential_matches = [key]
 
@@ -168,12 +399,21 @@ def add_paris_objects(
         for match in potential_matches:
             if match in olympic_athletes:
                 found = True
-                existing_athlete = match
-                paris_athlete_local_map[paris_athletes[key]["code"]] = olympic_athletes[
-                    match
-                ]
+                existing_athlete = olympic_athletes[match]
+                paris_athlete_local_map[paris_athletes[key]["code"]] = existing_athlete
                 break
 
+        if not found and use_fuzzy_matching:
+            existing_athlete = fuzzy_index.find(
+                split_key[0],
+                paris_athletes[key]["country_code"],
+                paris_athletes[key]["gender"],
+                paris_athletes[key]["birth_date"],
+            )
+            if existing_athlete is not None:
+                found = True
+                paris_athlete_local_map[paris_athletes[key]["code"]] = existing_athlete
+
         height = (
             paris_athletes[key]["height"]
             if paris_athletes[key]["height"] != "0"
@@ -189,6 +429,7 @@ def add_paris_objects(
             athlete_id = utils.get_next_id("ATHLETE_BIO")
             athlete_name = " ".join([word.capitalize() for word in split_name])
 
+            country_noc, country = noc_registry[paris_athletes[key]["country_code"]]
             new_athletes[key] = {
                 "athlete_id": athlete_id,
                 "name": athlete_name,
@@ -196,19 +437,18 @@ def add_paris_objects(
                 "born": paris_athletes[key]["birth_date"],
                 "height": height,
                 "weight": weight,
-                "country": olympic_nocs[paris_athletes[key]["country_code"].lower()][
-                    "country"
-                ],
-                "country_noc": olympic_nocs[
-                    paris_athletes[key]["country_code"].lower()
-                ]["noc"],
+                "country": country,
+                "country_noc": country_noc,
             }
             paris_athlete_local_map[paris_athletes[key]["code"]] = new_athletes[key]
+            utils.add_to_athlete_index(new_athletes[key])
+            if use_fuzzy_matching:
+                fuzzy_index.add(new_athletes[key])
         else:
-            if olympic_athletes[existing_athlete]["height"] == "" and height != "":
-                olympic_athletes[existing_athlete]["height"] = height
-            if olympic_athletes[existing_athlete]["weight"] == "" and weight != "":
-                olympic_athletes[existing_athlete]["weight"] = weight
+            if existing_athlete["height"] == "" and height != "":
+                existing_athlete["height"] = height
+            if existing_athlete["weight"] == "" and weight != "":
+                existing_athlete["weight"] = weight
 
         paris_athlete_local_map[paris_athletes[key]["code"]].update(
             {
@@ -218,36 +458,46 @@ def add_paris_objects(
         )
 
     paris_events = paris_data[constants.PARIS_PATHS.EVENTS]
+    event_values = utils.get_schema(constants.PARIS_PATHS.EVENTS, paris_events).extractor(
+        "event", "sport"
+    )
     event_result_ids = {}
-    for row in paris_events:
+    for event, sport in map(event_values, paris_events):
         # iterate over events.csv, for each event create a new result_id per event
         # and add to the id hash map
-        event_result_ids[row[0] + " " + row[2]] = utils.get_next_id("EVENT_RESULTS")
+        event_result_ids[event + " " + sport] = utils.get_next_id("EVENT_RESULTS")
 
     paris_edition_id = "63"
     olympic_paris_game = olympic_data[constants.OLYMPIC_PATHS.GAMES][paris_edition_id]
 
-    team_headers = paris_data[constants.PARIS_PATHS.TEAMS][0]
+    # the new rows are laid out like the rows of olympic_athlete_event_results.csv
+    results_schema = utils.get_schema(
+        constants.OLYMPIC_PATHS.EVENT_RESULTS,
+        olympic_data[constants.OLYMPIC_PATHS.EVENT_RESULTS],
+    )
+
+    team_rows = paris_data[constants.PARIS_PATHS.TEAMS]
+    team_schema = utils.get_schema(constants.PARIS_PATHS.TEAMS, team_rows)
 
     # setting team header indices
-    team_code_idx = team_headers.index("code")
-    athlete_team_code_idx = team_headers.index("athletes_codes")
-    athlete_team_name_idx = team_headers.index("athletes")
-    sport_idx = team_headers.index("discipline")
-    event_idx = team_headers.index("events")
-    noc_idx = team_headers.index("country_code")
-    is_active_idx = team_headers.index("current")
+    team_code_idx = team_schema.index("code")
+    athlete_team_code_idx = team_schema.index("athletes_codes")
+    athlete_team_name_idx = team_schema.index("athletes")
+    sport_idx = team_schema.index("discipline")
+    event_idx = team_schema.index("events")
+    noc_idx = team_schema.index("country_code")
+    is_active_idx = team_schema.index("current")
 
     # this set will be used to avoid duplicates in event results
     added = set()
 
     # iterate over teams and add event results based on athlete list
-    for row in paris_data[constants.PARIS_PATHS.TEAMS][1:]:
+    for row in team_rows[1:]:
         is_active = row[is_active_idx].lower() == "true"
         if is_active or not exclude_inactive_athletes:
             if row[athlete_team_code_idx] != "":
-                athletes = ast.literal_eval(row[athlete_team_code_idx])
-                athlete_names = ast.literal_eval(row[athlete_team_name_idx])
+                athletes = utils.parse_list_value(row[athlete_team_code_idx])
+                athlete_names = utils.parse_list_value(row[athlete_team_name_idx])
                 noc = row[noc_idx]
 
                 sport = row[sport_idx]
@@ -263,27 +513,29 @@ def add_paris_objects(
                         athlete = paris_athlete_local_map[code]
 
                         new_event_results.append(
-                            [
-                                olympic_paris_game["edition"],
-                                olympic_paris_game["edition_id"],
-                                athlete["country_noc"],
-                                sport,
-                                EVENT_MAP[full_event]
-                                if full_event in EVENT_MAP
-                                else full_event,
-                                event_result_ids[full_event]
-                                if full_event in event_result_ids
-                                else "",
-                                athlete["name"],
-                                athlete["athlete_id"],
-                                medallist_map.get(row[team_code_idx], {}).get(
-                                    "pos", ""
-                                ),
-                                medallist_map.get(row[team_code_idx], {}).get(
-                                    "medal", ""
-                                ),
-                                True,
-                            ]
+                            results_schema.make_row(
+                                {
+                                    "edition": olympic_paris_game["edition"],
+                                    "edition_id": olympic_paris_game["edition_id"],
+                                    "country_noc": athlete["country_noc"],
+                                    "sport": sport,
+                                    "event": EVENT_MAP[full_event]
+                                    if full_event in EVENT_MAP
+                                    else full_event,
+                                    "result_id": event_result_ids[full_event]
+                                    if full_event in event_result_ids
+                                    else "",
+                                    "athlete": athlete["name"],
+                                    "athlete_id": athlete["athlete_id"],
+                                    "pos": medallist_map.get(
+                                        row[team_code_idx], {}
+                                    ).get("pos", ""),
+                                    "medal": medallist_map.get(
+                                        row[team_code_idx], {}
+                                    ).get("medal", ""),
+                                    "isTeamSport": True,
+                                }
+                            )
                         )
                         if (
                             remove_duplicate_team_events
@@ -297,46 +549,38 @@ def add_paris_objects(
                         print("Could not find athlete code:", code)
                         if not exclude_not_found_athletes:
                             new_event_results.append(
-                                [
-                                    olympic_paris_game["edition"],
-                                    olympic_paris_game["edition_id"],
-                                    noc,
-                                    sport,
-                                    EVENT_MAP[full_event]
-                                    if full_event in EVENT_MAP
-                                    else full_event,
-                                    event_result_ids[full_event]
-                                    if full_event in event_result_ids
-                                    else "",
-                                    utils.convert_paris_to_normal_name(
-                                        athlete_names[i]
-                                    ).title(),
-                                    "",
-                                    medallist_map.get(row[team_code_idx], {}).get(
-                                        "pos", ""
-                                    ),
-                                    medallist_map.get(row[team_code_idx], {}).get(
-                                        "medal", ""
-                                    ),
-                                    True,
-                                ]
+                                results_schema.make_row(
+                                    {
+                                        "edition": olympic_paris_game["edition"],
+                                        "edition_id": olympic_paris_game["edition_id"],
+                                        "country_noc": noc,
+                                        "sport": sport,
+                                        "event": EVENT_MAP[full_event]
+                                        if full_event in EVENT_MAP
+                                        else full_event,
+                                        "result_id": event_result_ids[full_event]
+                                        if full_event in event_result_ids
+                                        else "",
+                                        "athlete": utils.convert_paris_to_normal_name(
+                                            athlete_names[i]
+                                        ).title(),
+                                        "athlete_id": "",
+                                        "pos": medallist_map.get(
+                                            row[team_code_idx], {}
+                                        ).get("pos", ""),
+                                        "medal": medallist_map.get(
+                                            row[team_code_idx], {}
+                                        ).get("medal", ""),
+                                        "isTeamSport": True,
+                                    }
+                                )
                             )
 
     # iterate over athletes and add remaining individual events
     for code in paris_athlete_local_map:
         athlete = paris_athlete_local_map[code]
-        try:
-            events = ast.literal_eval(athlete["events"])
-        except:
-            event_str = athlete["events"].replace("[", "").replace("]", "")
-            event_str = f'["{event_str}"]'
-            events = ast.literal_eval(event_str)
-        try:
-            sports = ast.literal_eval(athlete["sports"])
-        except:
-            sports_str = athlete["sports"].replace("[", "").replace("]", "")
-            sports_str = f'["{sports_str}"]'
-            sports = ast.literal_eval(sports_str)
+        events = utils.parse_list_value_lenient(athlete["events"])
+        sports = utils.parse_list_value_lenient(athlete["sports"])
 
         for event in events:
             for sport in sports:
@@ -353,23 +597,25 @@ def add_paris_objects(
                             sport = "Equestrian Eventing"
 
                         new_event_results.append(
-                            [
-                                olympic_paris_game["edition"],
-                                olympic_paris_game["edition_id"],
-                                athlete["country_noc"],
-                                sport,
-                                EVENT_MAP[full_event],
-                                event_result_ids[full_event],  # result_id
-                                athlete["name"],
-                                athlete["athlete_id"],
-                                medallist_map.get(f"{code} {full_event}", {}).get(
-                                    "pos", ""
-                                ),
-                                medallist_map.get(f"{code} {full_event}", {}).get(
-                                    "medal", ""
-                                ),
-                                False,
-                            ]
+                            results_schema.make_row(
+                                {
+                                    "edition": olympic_paris_game["edition"],
+                                    "edition_id": olympic_paris_game["edition_id"],
+                                    "country_noc": athlete["country_noc"],
+                                    "sport": sport,
+                                    "event": EVENT_MAP[full_event],
+                                    "result_id": event_result_ids[full_event],
+                                    "athlete": athlete["name"],
+                                    "athlete_id": athlete["athlete_id"],
+                                    "pos": medallist_map.get(
+                                        f"{code} {full_event}", {}
+                                    ).get("pos", ""),
+                                    "medal": medallist_map.get(
+                                        f"{code} {full_event}", {}
+                                    ).get("medal", ""),
+                                    "isTeamSport": False,
+                                }
+                            )
                         )
 
     # adding new athletes
@@ -451,55 +697,34 @@ def format_games_dates(data: dict[str, dict[str, str]]):
 # requires ATHLETE_BIO objects for birth year lookup
 
 def add_additional_info(data: dict[str, dict[str, str]]) -> None:
-    date_format = "%d-%b-%Y"
-
     results = data.get(constants.OLYMPIC_PATHS.EVENT_RESULTS, [])
-    bios = data.get(constants.OLYMPIC_PATHS.ATHLETE_BIO, {})
-    games = data.get(constants.OLYMPIC_PATHS.GAMES, {})
-
-    birth_dates = {}
+    ages = make_age_engine(data)
 
-    for ath in bios.values():
-        aid = ath.get("athlete_id")
-        born = ath.get("born", "")
-        if aid and born and born != "":
-            try:
-                birth_dates[str(aid)] = datetime.strptime(born, date_format)
-            except ValueError:
-                pass
+    if isinstance(results, EventResultsTable):
+        # columnar event results, the age is added as a new column
+        schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+        columns = schema.indices("athlete_id", "edition_id")
+        results.add_column("age", ages.get_ages(zip(*map(results.column_values, columns))))
+        return
 
     if results:
         results[0].append("age")
 
     for row in results[1:]:
-        try:
-            aid = str(row[7])  # Athlete ID column
-            eid = str(row[1])  # edition id column
-
-            if aid in birth_dates:
-                end_date = datetime.strptime(games[eid]["end_date"], date_format)
-                try:
-                    birthday = birth_dates[aid].replace(year=end_date.year)
-                except ValueError:  # handle feb 29 on non-leap year
-                    birthday = birth_dates[aid].replace(year=end_date.year, day=28)
-                year_correction = 0
-                if birthday > end_date:
-                    year_correction = 1
-
-                age = end_date.year - birth_dates[aid].year - year_correction
-                # This prevents "negative ages" or "200 year olds" from lowering the data score
-                if 10 <= age <= 99:
-                    row.append(str(age))
-                else:
-                    row.append("")
-            else:
-                row.append("")
-        except (ValueError, IndexError):
-            row.append("")
-
-
+        ages.append_age(row)
 
 
+# age engine for the games of the data, the birth dates come from the athlete id index (utils.athlete_index)
+# that is built once per athlete bio dict (utils.ensure_athlete_index) and kept up to date by add_paris_objects
+def make_age_engine(data: dict[str, dict[str, str]]) -> utils.AgeEngine:
+    utils.ensure_athlete_index(data.get(constants.OLYMPIC_PATHS.ATHLETE_BIO, {}))
+    return utils.AgeEngine(
+        data.get(constants.OLYMPIC_PATHS.GAMES, {}),
+        utils.get_schema(
+            constants.OLYMPIC_PATHS.EVENT_RESULTS,
+            data.get(constants.OLYMPIC_PATHS.EVENT_RESULTS),
+        ),
+    )
 
 
 #     standardizes data formats across the dataset, specifically removing units from physical stats
@@ -544,12 +769,31 @@ def clean_data(data: dict[str, dict[str, str]]):
                         c["noc"] = noc.upper()
 
     if constants.OLYMPIC_PATHS.EVENT_RESULTS in data:
-        for res in data[constants.OLYMPIC_PATHS.EVENT_RESULTS][1:]:
-            pos_idx = 8
-            if res[pos_idx]:
-                res[pos_idx] = str(res[pos_idx]).replace("=", "").strip()
-                if not res[pos_idx].isdigit():
-                    res[pos_idx] = ""
+        results = data[constants.OLYMPIC_PATHS.EVENT_RESULTS]
+        pos_idx = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results).index("pos")
+        if isinstance(results, EventResultsTable):
+            # plain ints are already clean positions, only the other values have to be looked at
+            positions = results.columns[pos_idx]
+            for i, position in list(positions.other.items()):
+                if position:
+                    position = str(position).replace("=", "").strip()
+                    positions.set(i, position if position.isdigit() else "")
+            return
+
+        for res in results[1:]:
+            clean_position(pos_idx, res)
+
+
+# removes the "=" of tied positions and empties positions that are not a number (ie "DNS") in an event results row,
+# pos_idx is the index of the "pos" column
+def clean_position(pos_idx: int, res: list):
+    position = res[pos_idx]
+    if type(position) is str and position.isdigit():
+        return  # already clean
+    if position:
+        res[pos_idx] = str(res[pos_idx]).replace("=", "").strip()
+        if not res[pos_idx].isdigit():
+            res[pos_idx] = ""
 
 
 # refines the paris data (Joy)
@@ -565,21 +809,18 @@ def refine_paris_data(paris):
     for filename, rows in paris.items():
         header = rows[0]
         refined_rows = [header]
-        # find indexes of relevant columns
+        # find indexes of relevant columns (-1 if the file does not have the column)
         # name,name_tv,gender,country_code,height,weight,events,birth_date, nationality_code (noc)
-        idx_name = header.index("name") if "name" in header else -1
-        idx_name_tv = header.index("name_tv") if "name_tv" in header else -1
-        idx_gender = header.index("gender") if "gender" in header else -1
-        idx_country_code = (
-            header.index("country_code") if "country_code" in header else -1
-        )
-        idx_height = header.index("height") if "height" in header else -1
-        idx_weight = header.index("weight") if "weight" in header else -1
-        idx_event = header.index("event") if "event" in header else -1
-        idx_birth_date = header.index("birth_date") if "birth_date" in header else -1
-        idx_noc = (
-            header.index("nationality_code") if "nationality_code" in header else -1
-        )
+        schema = utils.get_schema(filename, rows)
+        idx_name = schema.find("name")
+        idx_name_tv = schema.find("name_tv")
+        idx_gender = schema.find("gender")
+        idx_country_code = schema.find("country_code")
+        idx_height = schema.find("height")
+        idx_weight = schema.find("weight")
+        idx_event = schema.find("event")
+        idx_birth_date = schema.find("birth_date")
+        idx_noc = schema.find("nationality_code")
 
         for row in rows[1:]:
             row = row.copy()
@@ -622,80 +863,85 @@ def refine_paris_data(paris):
 
 
 # (Joy) Checking that Paris athletes, events, and medallists are internally consistent.
-def validate_paris_consistency(paris, legacy):
-    reports = {
-        "missing_athletes": [],
-        "missing_events": [],
-        "invalid_gender": [],
-        "invalid_noc": [],
-        "invalid_dob": [],
-    }
+# the medallist rows are checked by the rules of validation.RULES, in chunks that are spread over workers processes
+# when workers > 1 (constants.VALIDATION_WORKERS by default)
+# returns a validation.ValidationReport: the number of issues of every rule and the first offending values
+# with use_cache=True the report is saved in a manifest (constants.PARIS_VALIDATION_MANIFEST in the csv cache
+# directory constants.CSV_CACHE_DIR) together with the fingerprints of the input files (read from archive if it
+# is set), and reused as long as they are unchanged
+# nothing is mutated, so it can run on a thread next to create_objects, print_report=False leaves the
+# printing of the report (report.print_summary()) to the caller
+def validate_paris_consistency(
+    paris,
+    legacy,
+    workers: int | None = None,
+    use_cache: bool = False,
+    archive: str | None = None,
+    print_report: bool = True,
+) -> validation.ValidationReport:
+    if workers is None:
+        workers = constants.VALIDATION_WORKERS
+    sample_size = constants.VALIDATION_SAMPLE_SIZE
+
+    if use_cache:
+        fingerprints = {
+            name: utils.csv_fingerprint(utils.find_input_file(name, archive))
+            for name in list(constants.PARIS_PATHS.values()) + [constants.OLYMPIC_PATHS.COUNTRY]
+        }
+        manifest_file = os.path.join(constants.CSV_CACHE_DIR, constants.PARIS_VALIDATION_MANIFEST)
+        manifest = utils.load_manifest(manifest_file)
+        if (
+            manifest is not None
+            and manifest.get("version") == constants.PARIS_VALIDATION_MANIFEST_VERSION
+            and manifest["fingerprints"] == fingerprints
+            and manifest["noc_aliases"] == repr(constants.NOC_ALIASES)
+            and manifest["sample_size"] == sample_size
+        ):
+            report = validation.ValidationReport.from_data(manifest["report"], sample_size)
+            if print_report:
+                report.print_summary()
+            return report
 
     athletes_rows = paris.get(constants.PARIS_PATHS.ATHLETES, [])
-    athletes_header = athletes_rows[0]
     medallists = paris.get(constants.PARIS_PATHS.MEDALLISTS, [])
     events = paris.get(constants.PARIS_PATHS.EVENTS, [])
 
     # athletes list
-    idx_ath_code = athletes_header.index("code")
-
-    athletes_set = set(row[idx_ath_code] for row in athletes_rows[1:])
+    athlete_code = utils.get_schema(constants.PARIS_PATHS.ATHLETES, athletes_rows).getter("code")
     # events list
-    event_header = events[0]
-    idx_event_name = event_header.index("event")
-    event_codes_set = set(row[idx_event_name] for row in events[1:])
-    # medallists checks
-    m_header = medallists[0]
-    idx_ethlete_code = m_header.index("code_athlete")
-    idx_event_code = m_header.index("event")
-    idx_gender = m_header.index("gender")
-    idx_noc = m_header.index("nationality_code")
-    idx_birth_date = m_header.index("birth_date")
-
-    legacy_countries = legacy.get(constants.OLYMPIC_PATHS.COUNTRY, {})
-
-    legacy_nocs = set()
-
-    if isinstance(legacy_countries, dict):
-        legacy_nocs = {c.get("noc", "") for c in legacy_countries.values()}
-    elif isinstance(legacy_countries, list):
-        header = legacy_countries[0]
-        if "noc" in header:
-            idx = header.index("noc")
-        for row in legacy_countries[1:]:
-            legacy_nocs.add(row[idx])
-
-    for row in medallists[1:]:
-        # missing athletes and events
-        if row[idx_ethlete_code] not in athletes_set:
-            reports["missing_athletes"].append(row[idx_ethlete_code])
-
-        if row[idx_event_code] not in event_codes_set:
-            reports["missing_events"].append(row[idx_event_code])
-
-        # invalid gender
-        g = row[idx_gender].upper()
-        if g not in ["MALE", "FEMALE"]:
-            reports["invalid_gender"].append(row[idx_gender])
-
-        # invalid NOC
-        noc = row[idx_noc].upper()
-        if noc == "":
-            continue
-        if noc not in legacy_nocs:
-            reports["invalid_noc"].append(noc)
-
-        # invalid date of birth
-        dob = row[idx_birth_date]
-        if utils.normalize_date(dob) == "":
-            reports["invalid_dob"].append(dob)
-
-    for key, items in reports.items():
-        if items:
-            print(f"Validation Report - {key}: {len(items)} issues found.")
-            if key == "invalid_noc":
-                print("Invalid NOCs:", items[:10])
-    return reports
+    event_name = utils.get_schema(constants.PARIS_PATHS.EVENTS, events).getter("event")
+
+    noc_registry = utils.noc_registry or NocRegistry.from_countries(
+        legacy.get(constants.OLYMPIC_PATHS.COUNTRY, {})
+    )
+    context = validation.ValidationContext(
+        utils.get_schema(constants.PARIS_PATHS.MEDALLISTS, medallists),
+        set(map(athlete_code, athletes_rows[1:])),
+        set(map(event_name, events[1:])),
+        noc_registry,
+    )
+    report = validation.run_rules(
+        islice(medallists, 1, None),
+        context,
+        sample_size=sample_size,
+        chunk_size=constants.VALIDATION_CHUNK_SIZE,
+        workers=workers,
+    )
+
+    if use_cache:
+        utils.save_manifest(
+            manifest_file,
+            {
+                "version": constants.PARIS_VALIDATION_MANIFEST_VERSION,
+                "fingerprints": fingerprints,
+                "noc_aliases": repr(constants.NOC_ALIASES),
+                "sample_size": sample_size,
+                "report": report.to_data(),
+            },
+        )
+    if print_report:
+        report.print_summary()
+    return report
 
 
 #     generates a statistical summary table aggregated by olympic edition and country (NOC).
@@ -711,44 +957,270 @@ def validate_paris_consistency(paris, legacy):
 #     returns a list of lists representing the newmedaltally.csv
 
 def create_summary(data: dict[str, dict[str, str]]) -> list[list[str]]:
-    header = [
-        "edition",
-        "edition_id",
-        "Country",
-        "NOC",
-        "number_of_athletes",
-        "gold_medal_count",
-        "silver_medal_count",
-        "bronze_medal_count",
-        "total_medals",
-    ]
-    # we need to map the 3 letter NOC code to the full country name
-    noc_map = {}
-
-    if constants.OLYMPIC_PATHS.COUNTRY in data:
-        c_data = data[constants.OLYMPIC_PATHS.COUNTRY]
-        if isinstance(c_data, dict):
-            for c in c_data.values():
-                if "noc" in c and "country" in c:
-                    noc_map[c["noc"]] = c["country"]
     stats = {}
     results = data.get(constants.OLYMPIC_PATHS.EVENT_RESULTS, [])
 
     # to prevent duplicate medals / preserve medal uniqueness
     medal_tracker = {}
+    if not results:
+        return format_summary(data, stats)
+    schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+
+    if isinstance(results, EventResultsTable):
+        # edition, edition_id, noc, event, athlete_id, medal columns
+        columns = schema.indices(*constants.SUMMARY_COLUMNS)
+        add_summary_values(stats, medal_tracker, zip(*map(results.column_values, columns)))
+        return format_summary(data, stats)
 
     # skip the header row and iterate through data
-    for row in results[1:]:
-        if len(row) < 10:
-            continue
-        edition, eid, noc, event, aid, medal = (
-            row[0],
-            row[1],
-            row[2],
-            row[4],
-            row[7],
-            row[9],
+    add_summary_rows(stats, medal_tracker, results[1:], schema)
+    return format_summary(data, stats)
+
+
+# clean_data + add_additional_info + create_summary, returns the summary rows
+# event results rows are cleaned, aged and summarized in a single loop (utils.RowPipeline) instead of a loop per stage,
+# columnar event results in a single loop over the row indices (see process_event_results_table)
+# with workers > 1 (constants.EVENT_RESULTS_WORKERS by default) the editions are processed in worker processes,
+# see process_event_results_partitioned
+def process_event_results(
+    data: dict[str, dict[str, str]], workers: int | None = None
+) -> list[list[str]]:
+    if workers is None:
+        workers = constants.EVENT_RESULTS_WORKERS
+    results = data.get(constants.OLYMPIC_PATHS.EVENT_RESULTS, [])
+    if workers > 1 and results:
+        return process_event_results_partitioned(data, workers)
+    if isinstance(results, EventResultsTable):
+        return process_event_results_table(data, results)
+
+    clean_data(
+        {k: v for k, v in data.items() if k != constants.OLYMPIC_PATHS.EVENT_RESULTS}
+    )
+    ages = make_age_engine(data)
+    schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+    summary_values = schema.extractor(*constants.SUMMARY_COLUMNS)
+    stats = {}
+    medal_tracker = {}
+    if results:
+        results[0].append("age")
+    utils.RowPipeline(
+        [
+            partial(clean_position, schema.index("pos")),
+            ages.append_age,
+            partial(add_summary_row, stats, medal_tracker, summary_values),
+        ]
+    ).run(islice(results, 1, None))
+    return format_summary(data, stats)
+
+
+# process_event_results for columnar event results, the rows are cleaned, aged and summarized in one loop over the
+# codes of the columns (the int values and category codes) instead of the decoded strings of every column.
+# Only the "other" values of the position column need cleaning, the ages are cached by (athlete id, edition id) code
+# and the summary is keyed by codes, its keys are turned back into strings once at the end (in first row order)
+def process_event_results_table(
+    data: dict[str, dict[str, str]], results: EventResultsTable
+) -> list[list[str]]:
+    clean_data(
+        {k: v for k, v in data.items() if k != constants.OLYMPIC_PATHS.EVENT_RESULTS}
+    )
+    ages = make_age_engine(data)
+    schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+    editions, eids, nocs, events, aids, medals = map(
+        results.columns.__getitem__, schema.indices(*constants.SUMMARY_COLUMNS)
+    )
+    positions = results.columns[schema.index("pos")]
+    eid_other = eids.other
+    aid_other = aids.other
+    pos_other = positions.other
+    medal_names = [get_medal_name(medal) for medal in medals.categories]
+
+    stats = {}
+    medal_tracker = {}
+    age_codes = {}  # {(athlete id, edition id): age}, ids are the int values or the other values
+    row_ages = []
+    cleaned = []  # (row index, cleaned position)
+    for i, (edition, eid, noc, event, aid, medal, position) in enumerate(
+        zip(
+            editions.codes,
+            eids.values,
+            nocs.codes,
+            events.codes,
+            aids.values,
+            medals.codes,
+            positions.values,
         )
+    ):
+        if position == OTHER:
+            position = pos_other[i]
+            if position:
+                position = str(position).replace("=", "").strip()
+                cleaned.append((i, position if position.isdigit() else ""))
+        if eid == OTHER:
+            eid = eid_other[i]
+        if aid == OTHER:
+            aid = aid_other[i]
+
+        pair = (aid, eid)
+        age = age_codes.get(pair)
+        if age is None:
+            age = age_codes[pair] = ages.get_age(str(aid), str(eid))
+        row_ages.append(age)
+
+        key = (edition, eid, noc)
+        counts = stats.get(key)
+        if counts is None:
+            counts = stats[key] = {"ids": set(), "G": 0, "S": 0, "B": 0}
+        counts["ids"].add(aid)
+        medal_name = medal_names[medal]
+        if medal_name:
+            tracker_key = (eid, noc, event, medal_name)
+            if tracker_key not in medal_tracker:
+                medal_tracker[tracker_key] = True
+                counts[medal_name] += 1
+
+    for i, position in cleaned:
+        positions.set(i, position)
+    results.add_column("age", row_ages)
+
+    edition_names = editions.categories
+    noc_names = nocs.categories
+    stats = {
+        (edition_names[edition], str(eid), noc_names[noc]): counts
+        for (edition, eid, noc), counts in stats.items()
+    }
+    return format_summary(data, stats)
+
+
+# process_event_results with the event results split by edition_id, every edition is cleaned, aged and summarized
+# in a pool of workers processes (see process_event_partition). The editions are handed out largest first and a worker
+# takes the next one as soon as it is done, so a large edition does not hold up the end of the run.
+# Editions share no summary keys (they contain the edition id), the positions and ages are written back by row index
+# and the summary keys are merged in the order of their first row, so the result is the same as a single pass
+def process_event_results_partitioned(
+    data: dict[str, dict[str, str]], workers: int
+) -> list[list[str]]:
+    results = data[constants.OLYMPIC_PATHS.EVENT_RESULTS]
+    clean_data(
+        {k: v for k, v in data.items() if k != constants.OLYMPIC_PATHS.EVENT_RESULTS}
+    )
+    utils.ensure_athlete_index(data.get(constants.OLYMPIC_PATHS.ATHLETE_BIO, {}))
+    births = {
+        str(athlete.get("athlete_id")): athlete.get("born", "")
+        for athlete in utils.athlete_index.values()
+    }
+    games = {
+        eid: {"end_date": game["end_date"]}
+        for eid, game in data.get(constants.OLYMPIC_PATHS.GAMES, {}).items()
+        if "end_date" in game
+    }
+
+    # only the columns the stages need are sent to the workers
+    schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+    columns = constants.SUMMARY_COLUMNS + ("pos",)
+    if isinstance(results, EventResultsTable):
+        rows = list(zip(*map(results.column_values, schema.indices(*columns))))
+    else:
+        rows = list(map(schema.extractor(*columns), islice(results, 1, None)))
+    editions = {}  # {edition id: [row index]}
+    for i, row in enumerate(rows):
+        editions.setdefault(row[1], []).append(i)
+    partitions = sorted(editions.values(), key=len, reverse=True)
+
+    positions = [row[-1] for row in rows]
+    ages = [""] * len(rows)
+    first_rows = []  # (first row index, summary key, counts)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_event_partition_worker,
+        initargs=(games, births, schema.header),
+    ) as pool:
+        tasks = pool.map(
+            process_event_partition, ([rows[i] for i in indices] for indices in partitions)
+        )
+        for indices, (part_positions, part_ages, stats, first) in zip(partitions, tasks):
+            for i, position, age in zip(indices, part_positions, part_ages):
+                positions[i] = position
+                ages[i] = age
+            for key, counts in stats.items():
+                first_rows.append((indices[first[key]], key, counts))
+
+    pos_idx = schema.index("pos")
+    if isinstance(results, EventResultsTable):
+        column = results.columns[pos_idx]
+        for i, row in enumerate(rows):
+            if positions[i] != row[-1]:
+                column.set(i, positions[i])
+        results.add_column("age", ages)
+    else:
+        results[0].append("age")
+        for row, position, age in zip(islice(results, 1, None), positions, ages):
+            if row[pos_idx] != position:
+                row[pos_idx] = position
+            row.append(age)
+
+    stats = {key: counts for _, key, counts in sorted(first_rows, key=lambda x: x[0])}
+    return format_summary(data, stats)
+
+
+# age engine of a worker process of process_event_results_partitioned, set once per worker
+partition_ages = None
+
+
+def init_event_partition_worker(games: dict, births: dict, header: tuple):
+    global partition_ages
+    partition_ages = utils.AgeEngine(games, Schema(header), births)
+
+
+# cleans, ages and summarizes the rows of one edition (run in a worker process)
+# rows are (edition, edition_id, country_noc, event, athlete_id, medal, pos) tuples,
+# returns the cleaned positions and the ages of the rows, the summary stats and the index of the first row of
+# every summary key
+def process_event_partition(rows: list[tuple]) -> tuple:
+    positions = []
+    ages = []
+    stats = {}
+    first_rows = {}
+    medal_tracker = {}
+    cell = [None]
+    for i, (edition, eid, noc, event, aid, medal, position) in enumerate(rows):
+        cell[0] = position
+        clean_position(0, cell)
+        positions.append(cell[0])
+        ages.append(partition_ages.get_age(str(aid), str(eid)))
+
+        key = (edition, eid, noc)
+        counts = stats.get(key)
+        if counts is None:
+            counts = stats[key] = {"ids": set(), "G": 0, "S": 0, "B": 0}
+            first_rows[key] = i
+        counts["ids"].add(aid)
+        medal_name = get_medal_name(medal) if medal != "" else None
+        if medal_name:
+            tracker_key = (eid, noc, event, medal_name)
+            if tracker_key not in medal_tracker:
+                medal_tracker[tracker_key] = True
+                counts[medal_name] += 1
+    return positions, ages, stats, first_rows
+
+
+# aggregates event result rows into stats: {(edition, edition_id, noc): {"ids": {athlete ids}, "G": n, "S": n, "B": n}}
+# medal_tracker holds the (edition_id, noc, event, medal) combinations that were already counted
+# the columns are read through the event results schema, rows that are too short are skipped
+def add_summary_rows(stats: dict, medal_tracker: dict, rows, schema: Schema) -> None:
+    width = schema.width(*constants.SUMMARY_COLUMNS)
+    add_summary_values(
+        stats,
+        medal_tracker,
+        map(
+            schema.extractor(*constants.SUMMARY_COLUMNS),
+            (row for row in rows if len(row) >= width),
+        ),
+    )
+
+
+# same as add_summary_rows but accepts (edition, edition_id, noc, event, athlete_id, medal) tuples
+def add_summary_values(stats: dict, medal_tracker: dict, values) -> None:
+    for edition, eid, noc, event, aid, medal in values:
         # create a unique key for grouping
         key = (edition, eid, noc)
         if key not in stats:
@@ -756,27 +1228,70 @@ def create_summary(data: dict[str, dict[str, str]]) -> list[list[str]]:
         # add the athlete ID to the set
         stats[key]["ids"].add(aid)
 
-        medal_name = None
-        if "Gold" in medal:
-            medal_name = "G"
-        elif "Silver" in medal:
-            medal_name = "S"
-        elif "Bronze" in medal:
-            medal_name = "B"
-
+        medal_name = get_medal_name(medal)
         if medal_name:
             tracker_key = (eid, noc, event, medal_name)
             if tracker_key not in medal_tracker:
                 medal_tracker[tracker_key] = True
                 stats[key][medal_name] += 1
 
+
+# add_summary_values for a single event results row (for utils.RowPipeline), rows that are too short are skipped
+# summary_values reads the constants.SUMMARY_COLUMNS of a row (Schema.extractor)
+def add_summary_row(stats: dict, medal_tracker: dict, summary_values, row: list) -> None:
+    try:
+        edition, eid, noc, event, aid, medal = summary_values(row)
+    except IndexError:
+        return
+    key = (edition, eid, noc)
+    counts = stats.get(key)
+    if counts is None:
+        counts = stats[key] = {"ids": set(), "G": 0, "S": 0, "B": 0}
+    counts["ids"].add(aid)
+
+    medal_name = get_medal_name(medal) if medal != "" else None
+    if medal_name:
+        tracker_key = (eid, noc, event, medal_name)
+        if tracker_key not in medal_tracker:
+            medal_tracker[tracker_key] = True
+            counts[medal_name] += 1
+
+
+def get_medal_name(medal: str) -> str | None:
+    if "Gold" in medal:
+        return "G"
+    elif "Silver" in medal:
+        return "S"
+    elif "Bronze" in medal:
+        return "B"
+    return None
+
+
+# turns the aggregated stats into the rows of newmedaltally.csv (header included)
+def format_summary(data: dict[str, dict[str, str]], stats: dict) -> list[list[str]]:
+    header = [
+        "edition",
+        "edition_id",
+        "Country",
+        "NOC",
+        "number_of_athletes",
+        "gold_medal_count",
+        "silver_medal_count",
+        "bronze_medal_count",
+        "total_medals",
+    ]
+    # we need to map the 3 letter NOC code to the full country name
+    noc_registry = utils.noc_registry or NocRegistry.from_countries(
+        data.get(constants.OLYMPIC_PATHS.COUNTRY, {})
+    )
+
     output = [header]
     # sort the keys to ensure the CSV is ordered chronologically
     for key in sorted(stats.keys(), key=lambda x: (x[0], x[2])):
         val = stats[key]
         # calculate total medals sum
         total = val["G"] + val["S"] + val["B"]
-        c_name = noc_map.get(key[2], key[2])
+        c_name = noc_registry.country(key[2], key[2])
         output.append(
             [
                 key[0],  # edition
@@ -793,29 +1308,191 @@ def create_summary(data: dict[str, dict[str, str]]) -> list[list[str]]:
     return output
 
 
+# incremental version of clean_data + add_additional_info + create_summary for the event results
+# the rows of olympic_athlete_event_results.csv are the first file_row_count rows after the header,
+# anything after them (the paris rows) is always processed.
+# A manifest from the previous run (constants.EVENT_RESULTS_MANIFEST) keeps the hash of every file row together with
+# its processed (cleaned + age) row, the birth dates / games end dates used for the ages and a summary state
+# that rows can be removed from. Only inserted / changed rows and rows of athletes whose birth date changed are
+# processed again, deleted rows are taken out of the summary state.
+# Falls back to a full run (and rebuilds the manifest) when there is no usable manifest or the games changed.
+# returns the rows of newmedaltally.csv like create_summary
+def process_event_results_incremental(
+    data: dict[str, dict[str, str]],
+    file_row_count: int,
+    manifest_file: str | None = None,
+) -> list[list[str]]:
+    if manifest_file is None:
+        manifest_file = constants.EVENT_RESULTS_MANIFEST
+    results = data[constants.OLYMPIC_PATHS.EVENT_RESULTS]
+    bios = data.get(constants.OLYMPIC_PATHS.ATHLETE_BIO, {})
+    games = data.get(constants.OLYMPIC_PATHS.GAMES, {})
+
+    # athlete bios and countries are always cleaned, they are not part of the delta
+    clean_data(
+        {k: v for k, v in data.items() if k != constants.OLYMPIC_PATHS.EVENT_RESULTS}
+    )
+
+    header = results[0]
+    schema = utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, results)
+    athlete_id_idx = schema.index("athlete_id")
+    summary_values = schema.extractor(*constants.SUMMARY_COLUMNS)
+    file_rows = results[1 : file_row_count + 1]
+    paris_rows = results[file_row_count + 1 :]
+    hashes = [utils.hash_row(row) for row in file_rows]
+    born = {str(ath.get("athlete_id")): ath.get("born", "") for ath in bios.values()}
+    end_dates = {eid: game.get("end_date", "") for eid, game in games.items()}
+
+    manifest = utils.load_manifest(manifest_file)
+    if (
+        manifest is None
+        or manifest.get("version") != constants.EVENT_RESULTS_MANIFEST_VERSION
+        or manifest["end_dates"] != end_dates
+        or manifest["header"] != header
+    ):
+        manifest = {"rows": {}, "hashes": [], "born": {}, "ids": {}, "medals": {}}
+
+    old_rows = manifest["rows"]
+    old_born = manifest["born"]
+    changed_athletes = {aid for aid in born if old_born.get(aid) != born[aid]}
+    changed_athletes.update(aid for aid in old_born if aid not in born)
+
+    # rows that are not in the manifest (or whose athlete's birth date changed) go through the normal stages
+    dirty_rows = []
+    for i, h in enumerate(hashes):
+        if h in old_rows and file_rows[i][athlete_id_idx] not in changed_athletes:
+            results[i + 1] = list(old_rows[h])
+        else:
+            dirty_rows.append(file_rows[i])
+    print(
+        "incremental event results:",
+        len(dirty_rows),
+        "of",
+        len(file_rows),
+        "rows processed",
+    )
+
+    ages = make_age_engine(data)
+    utils.RowPipeline([partial(clean_position, schema.index("pos")), ages.append_age]).run(
+        dirty_rows + paris_rows
+    )
+    header.append("age")
+
+    # patching the summary state, only the difference between the old and new rows is applied
+    summary_state = {"ids": manifest["ids"], "medals": manifest["medals"]}
+    old_counts = Counter(manifest["hashes"])
+    new_counts = Counter(hashes)
+    for h, count in (old_counts - new_counts).items():
+        for _ in range(count):
+            update_summary_state(summary_state, old_rows[h], -1, summary_values)
+    new_rows = {}
+    for i, h in enumerate(hashes):
+        new_rows[h] = results[i + 1]
+    for h, count in (new_counts - old_counts).items():
+        for _ in range(count):
+            update_summary_state(summary_state, new_rows[h], 1, summary_values)
+
+    utils.save_manifest(
+        manifest_file,
+        {
+            "version": constants.EVENT_RESULTS_MANIFEST_VERSION,
+            "header": header[:-1],
+            "end_dates": end_dates,
+            "born": born,
+            "hashes": hashes,
+            "rows": new_rows,
+            "ids": summary_state["ids"],
+            "medals": summary_state["medals"],
+        },
+    )
+
+    # the medal of an (edition_id, noc, event) is credited to the first (edition, edition_id, noc) key it was seen with,
+    # this is only known without the row order when every edition_id has a single edition name
+    if any(len(keys) > 1 for keys in summary_state["medals"].values()):
+        return create_summary(data)
+
+    stats = {}
+    for key, athlete_ids in summary_state["ids"].items():
+        stats[key] = {"ids": set(athlete_ids), "G": 0, "S": 0, "B": 0}
+    medal_tracker = {}
+    for tracker_key, keys in summary_state["medals"].items():
+        stats[next(iter(keys))][tracker_key[3]] += 1
+        medal_tracker[tracker_key] = True
+    add_summary_rows(stats, medal_tracker, paris_rows, schema)
+    return format_summary(data, stats)
+
+
+# adds (sign=1) or removes (sign=-1) an event result row from a summary state
+# the state counts rows instead of using sets so that removing a row is possible
+# {"ids": {(edition, edition_id, noc): {athlete_id: rows}}, "medals": {(edition_id, noc, event, medal): {key: rows}}}
+# summary_values reads the constants.SUMMARY_COLUMNS of a row (Schema.extractor), rows that are too short are skipped
+def update_summary_state(state: dict, row: list[str], sign: int, summary_values) -> None:
+    try:
+        edition, eid, noc, event, aid, medal = summary_values(row)
+    except IndexError:
+        return
+    key = (edition, eid, noc)
+    adjust_count(state["ids"], key, aid, sign)
+    medal_name = get_medal_name(medal)
+    if medal_name:
+        adjust_count(state["medals"], (eid, noc, event, medal_name), key, sign)
+
+
+# adjusts counts[outer][inner] by sign, removing entries that drop to zero
+def adjust_count(counts: dict, outer, inner, sign: int) -> None:
+    inner_counts = counts.setdefault(outer, {})
+    inner_counts[inner] = inner_counts.get(inner, 0) + sign
+    if inner_counts[inner] == 0:
+        del inner_counts[inner]
+        if not inner_counts:
+            del counts[outer]
+
+
 # accepts the dictionary of data objects
-# converts dictionary-based objects back into list of lists format
-# ensures all files are ready for CSV writing using utils.write_csv_file
-# returns a dictionary of filename: row ...
-def prepare_csv_write(data: dict[str, dict[str, str]]) -> dict[str, list[list[str]]]:
+# converts dictionary-based objects back into rows for utils.write_csv_file
+# the rows of the object tables are generated while the file is being written (see iter_object_rows),
+# with the columns of the file's input header (its registered schema, see utils.schemas)
+# returns a dictionary of filename: rows, the rows are a list (tables kept as rows) or an iterator that yields
+# the header and then every row
+def prepare_csv_write(data: dict[str, dict[str, str]]) -> dict[str, Iterable[list[str]]]:
     final_files = {}
 
     for filename, content in data.items():
         if isinstance(content, list):
             final_files[filename] = content
+        elif isinstance(content, EventResultsTable):
+            # rows are only rebuilt while the file is being written
+            final_files[filename] = content.iter_rows()
         elif isinstance(content, dict):
             if not content:
                 final_files[filename] = []
                 continue
 
-            # Get the first key
-            first_key = next(iter(content))
-            # Use the key to get the actual object to extract headers
-            headers = list(content[first_key].keys())
-
-            rows = [headers]
-            for obj in content.values():
-                rows.append([str(obj.get(h, "")) for h in headers])
-            final_files[filename] = rows
+            schema = utils.schemas.get(filename)
+            if schema is not None:
+                headers = list(schema.header)
+            else:
+                # tables that were not read through parse_data use the keys of their first object
+                headers = list(next(iter(content.values())).keys())
+            final_files[filename] = iter_object_rows(content, headers)
 
     return final_files
+
+
+# yields the header and then the row of every object, the values of records are read with one precomputed
+# getter per record type (records.make_fields_getter), other objects (ie the dicts of new athletes) use .get
+def iter_object_rows(objects: dict, headers: list[str]):
+    yield list(headers)
+    getters = {}
+    for obj in objects.values():
+        object_type = type(obj)
+        if object_type not in getters:
+            getters[object_type] = make_fields_getter(object_type, headers)
+        getter = getters[object_type]
+        if getter is not None:
+            try:
+                yield list(map(str, getter(obj)))
+                continue
+            except AttributeError:
+                pass  # a value is missing (the csv row was shorter than the header)
+        yield [str(obj.get(h, "")) for h in headers]
@@ -0,0 +1,65 @@
+# one registry of the NOC codes and their country names, built once from olympics_country.csv and paris/nocs.csv
+# (see jobs.combine_nocs) and shared by the stages through utils.noc_registry
+# codes are looked up case-insensitively, historical / alternative codes can be added as aliases of a code
+
+
+class NocRegistry:
+    def __init__(self):
+        self.countries = {}  # {case folded code: (code, country)}
+        self.aliases = {}  # {case folded alias: case folded code}
+
+    def clear(self):
+        self.countries.clear()
+        self.aliases.clear()
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    @staticmethod
+    def fold(code: str) -> str:
+        return code.casefold()
+
+    def resolve(self, code: str) -> str:
+        key = self.fold(code)
+        return self.aliases.get(key, key)
+
+    # adds a code, the first country added for a code is kept, returns False if the code was already there
+    def add(self, code: str, country: str) -> bool:
+        key = self.fold(code)
+        if key in self.countries:
+            return False
+        self.countries[key] = (code, country)
+        return True
+
+    def add_alias(self, alias: str, code: str):
+        self.aliases[self.fold(alias)] = self.fold(code)
+
+    def __contains__(self, code: str) -> bool:
+        return self.resolve(code) in self.countries
+
+    # returns (code, country) for a code or alias, raises KeyError if it is not registered
+    def __getitem__(self, code: str) -> tuple[str, str]:
+        return self.countries[self.resolve(code)]
+
+    def get(self, code: str, default=None):
+        return self.countries.get(self.resolve(code), default)
+
+    def country(self, code: str, default: str | None = None) -> str | None:
+        entry = self.get(code)
+        return entry[1] if entry is not None else default
+
+    # builds a registry from the country objects of create_objects ({key: {"noc": ..., "country": ...}})
+    # or the olympics_country.csv rows, for stages that run without combine_nocs
+    @classmethod
+    def from_countries(cls, countries: dict | list[list[str]]) -> "NocRegistry":
+        registry = cls()
+        if isinstance(countries, dict):
+            for country in countries.values():
+                if "noc" in country:
+                    registry.add(country["noc"], country.get("country", ""))
+        elif countries and "noc" in countries[0]:
+            noc_idx = countries[0].index("noc")
+            country_idx = countries[0].index("country") if "country" in countries[0] else None
+            for row in countries[1:]:
+                registry.add(row[noc_idx], row[country_idx] if country_idx is not None else "")
+        return registry
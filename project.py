@@ -14,6 +14,8 @@
 import utils
 import jobs
 import constants
+from event_results_table import EventResultsTable
+from scheduler import StageScheduler
 
 # ----------------------------------------------------
 # MS2 TEAM MEMBERS & RESPONSIBILITIES
@@ -33,46 +35,141 @@ def main():
     #   This is the entrypoint executed by runproject.py.
     #   dont change its name or signature.
 
+    # the stages below declare the values they read and produce, the scheduler runs every stage as soon as its
+    # inputs are ready, so independent stages (ie the olympic and paris parsing, or validation next to
+    # create_objects) run at the same time. The printed output stays in the order the stages are listed
+    stages = StageScheduler(max_workers=constants.STAGE_WORKERS)
+
     # ----------Henry's Part----------
-    olympic_raw_data = jobs.parse_data(constants.OLYMPIC_PATHS.values())
-    paris_raw_data = jobs.parse_data(constants.PARIS_PATHS.values())
+    # the athlete bio file is only scanned once (create_objects), so it is read lazily
+    # and never held in memory as a raw list of rows
+    # the event results are also read lazily when they are stored as columns (see below)
+    # with constants.CONCURRENT_INGEST the files of a parse_data call are read at the same time, the large lazy
+    # files are parsed into the csv cache in a worker process and their rows are then streamed from the cache entry
+    columnar = (
+        constants.COLUMNAR_EVENT_RESULTS and not constants.INCREMENTAL_EVENT_RESULTS
+    )
+    lazy_files = {constants.OLYMPIC_PATHS.ATHLETE_BIO}
+    if columnar:
+        lazy_files.add(constants.OLYMPIC_PATHS.EVENT_RESULTS)
+
+    # EventResultsTable already stores the event result columns dictionary / int encoded,
+    # their values are only interned while parsing when the results are kept as rows
+    categorical_columns = dict(constants.CATEGORICAL_COLUMNS)
+    if columnar:
+        categorical_columns.pop(constants.OLYMPIC_PATHS.EVENT_RESULTS, None)
+
+    def parse_files(filenames):
+        return jobs.parse_data(
+            list(filenames),
+            lazy_files=lazy_files,
+            concurrent=constants.CONCURRENT_INGEST,
+            use_cache=True,
+            archive=constants.DATASET_ARCHIVE,
+            categorical_columns=categorical_columns,
+        )
+
+    stages.add(
+        "parse_olympic",
+        lambda: parse_files(constants.OLYMPIC_PATHS.values()),
+        outputs=["olympic_raw"],
+    )
+    stages.add(
+        "parse_paris",
+        lambda: parse_files(constants.PARIS_PATHS.values()),
+        outputs=["paris_raw"],
+    )
 
-    jobs.combine_nocs(
-        olympic_raw_data[constants.OLYMPIC_PATHS.COUNTRY],
-        paris_raw_data[constants.PARIS_PATHS.NOCS],
+    # the event results are kept in typed / dictionary encoded columns instead of a list of lists
+    # (the incremental mode works on the row lists, so it keeps them)
+    # also returns the number of rows that came from olympic_athlete_event_results.csv (used by the incremental mode),
+    # len() counts the header row for the row list and the table alike
+    def load_event_results(olympic_raw):
+        results = olympic_raw[constants.OLYMPIC_PATHS.EVENT_RESULTS]
+        if columnar:
+            results = EventResultsTable.from_rows(results)
+        return results, len(results) - 1
+
+    stages.add(
+        "event_results",
+        load_event_results,
+        inputs=["olympic_raw"],
+        outputs=["event_results", "file_row_count"],
     )
 
-    # setting the new athlete id and result id global vars to be incremented later
-    utils.find_next_id(
-        data=olympic_raw_data[constants.OLYMPIC_PATHS.ATHLETE_BIO],
-        key="ATHLETE_BIO",
-        index=0,
+    stages.add(
+        "combine_nocs",
+        lambda olympic_raw, paris_raw: jobs.combine_nocs(
+            olympic_raw[constants.OLYMPIC_PATHS.COUNTRY],
+            paris_raw[constants.PARIS_PATHS.NOCS],
+        ),
+        inputs=["olympic_raw", "paris_raw"],
+        outputs=["noc_registry"],
     )
-    utils.find_next_id(
-        data=olympic_raw_data[constants.OLYMPIC_PATHS.EVENT_RESULTS],
-        key="EVENT_RESULTS",
-        index=5,
+
+    # setting the result id global var to be incremented later
+    stages.add(
+        "find_next_id",
+        lambda event_results: utils.find_next_id(
+            data=event_results,
+            key="EVENT_RESULTS",
+            index=utils.get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS).index("result_id"),
+        ),
+        inputs=["event_results"],
+        outputs=["next_result_id"],
     )
 
     # sets a global map used in utils
-    utils.create_athlete_edition_id_map(
-        event_data=olympic_raw_data[constants.OLYMPIC_PATHS.EVENT_RESULTS],
-        editions=olympic_raw_data[constants.OLYMPIC_PATHS.GAMES],
+    stages.add(
+        "athlete_edition_map",
+        lambda olympic_raw, event_results: utils.create_athlete_edition_id_map(
+            event_data=event_results,
+            editions=olympic_raw[constants.OLYMPIC_PATHS.GAMES],
+        ),
+        inputs=["olympic_raw", "event_results"],
+        outputs=["athlete_edition_map"],
     )
 
-    # creating the olympic objects
-    olympic_unique_identifier_columns = {
-        constants.OLYMPIC_PATHS.ATHLETE_BIO: ["name", "country_noc"],
-        constants.OLYMPIC_PATHS.COUNTRY: ["noc"],
-        constants.OLYMPIC_PATHS.GAMES: ["edition_id"],
-    }
-    olympic_data = jobs.create_objects(
-        olympic_raw_data, olympic_unique_identifier_columns
+    # creating the olympic objects (the country rows are the ones combine_nocs added the paris nocs to,
+    # the bio birth dates need the athlete edition map)
+    def create_olympic_objects(olympic_raw, event_results, noc_registry, athlete_edition_map):
+        olympic_raw_data = dict(olympic_raw)
+        olympic_raw_data[constants.OLYMPIC_PATHS.EVENT_RESULTS] = event_results
+        # the athlete id is tracked while create_objects consumes the lazy bio rows
+        olympic_raw_data[constants.OLYMPIC_PATHS.ATHLETE_BIO] = utils.track_next_id(
+            data=olympic_raw_data[constants.OLYMPIC_PATHS.ATHLETE_BIO],
+            key="ATHLETE_BIO",
+            index=utils.get_schema(constants.OLYMPIC_PATHS.ATHLETE_BIO).index("athlete_id"),
+        )
+        olympic_unique_identifier_columns = {
+            constants.OLYMPIC_PATHS.ATHLETE_BIO: ["name", "country_noc"],
+            constants.OLYMPIC_PATHS.COUNTRY: ["noc"],
+            constants.OLYMPIC_PATHS.GAMES: ["edition_id"],
+        }
+        olympic_data = jobs.create_objects(
+            olympic_raw_data, olympic_unique_identifier_columns
+        )
+        # athlete_id -> athlete object index shared by the later stages
+        utils.build_athlete_index(olympic_data[constants.OLYMPIC_PATHS.ATHLETE_BIO])
+        return olympic_data
+
+    stages.add(
+        "create_olympic_objects",
+        create_olympic_objects,
+        inputs=["olympic_raw", "event_results", "noc_registry", "athlete_edition_map"],
+        outputs=["olympic_data"],
     )
 
     # --------Joy's Part-------------
-    # validating paris consistency
-    jobs.validate_paris_consistency(paris_raw_data, olympic_data)
+    # validating paris consistency, it only reads the paris rows and the noc registry
+    stages.add(
+        "validate_paris",
+        lambda paris_raw, noc_registry: jobs.validate_paris_consistency(
+            paris_raw, {}, use_cache=True, archive=constants.DATASET_ARCHIVE
+        ),
+        inputs=["paris_raw", "noc_registry"],
+        outputs=["validation_report"],
+    )
 
     # ----------Henry's Part----------
     # creating the paris objects
@@ -80,26 +177,64 @@ def main():
         constants.PARIS_PATHS.ATHLETES: ["name_tv", "country_code"],
         constants.PARIS_PATHS.NOCS: ["code"],
     }
-    paris_data = jobs.create_objects(paris_raw_data, paris_unique_identifier_columns)
+    stages.add(
+        "create_paris_objects",
+        lambda paris_raw: jobs.create_objects(paris_raw, paris_unique_identifier_columns),
+        inputs=["paris_raw"],
+        outputs=["paris_data"],
+    )
 
     # set all of the optional booleans to True for what I believe yields a more accurate dataset (lower score in the checker though)
-    jobs.add_paris_objects(olympic_data, paris_data)
-    jobs.format_games_dates(olympic_data[constants.OLYMPIC_PATHS.GAMES])
+    # (new athletes and results get ids after the olympic ones, so this waits for both ids)
+    stages.add(
+        "add_paris_objects",
+        lambda olympic_data, paris_data, next_result_id: jobs.add_paris_objects(
+            olympic_data, paris_data
+        ),
+        inputs=["olympic_data", "paris_data", "next_result_id"],
+        outputs=["paris_results"],
+    )
+    stages.add(
+        "format_games_dates",
+        lambda olympic_data: jobs.format_games_dates(
+            olympic_data[constants.OLYMPIC_PATHS.GAMES]
+        ),
+        inputs=["olympic_data"],
+        outputs=["games_dates"],
+    )
 
     # ----------Batu's Part----------
-    # 1. Clean Data
-    jobs.clean_data(olympic_data)
-    # 2. Add Additional Info
-    jobs.add_additional_info(olympic_data)
+    def summarize(olympic_data, file_row_count, paris_results, games_dates):
+        if constants.INCREMENTAL_EVENT_RESULTS:
+            # 1-3. only the event results that changed since the last run are cleaned / aged / summarized
+            return jobs.process_event_results_incremental(olympic_data, file_row_count)
+        # 1-3. Clean Data, Add Additional Info (age) and Generate Summary, in one pass over the event results
+        return jobs.process_event_results(olympic_data)
+
+    stages.add(
+        "process_event_results",
+        summarize,
+        inputs=["olympic_data", "file_row_count", "paris_results", "games_dates"],
+        outputs=["summary_data"],
+    )
 
-    # 3. Generate Summary
-    summary_data = jobs.create_summary(olympic_data)
     # 4. Prepare for Output
-    final_data = jobs.prepare_csv_write(olympic_data)
-    utils.write_csv_file("new_medal_tally.csv", summary_data)
-
-    # Write the Main Olympic Files
-    for filename, rows in final_data.items():
-        if "paris" not in filename:
-            new_name = f"new_{filename}"
-            utils.write_csv_file(new_name, rows)
+    # Write the medal tally and the Main Olympic Files (all at the same time)
+    def write_output(olympic_data, summary_data):
+        final_data = jobs.prepare_csv_write(olympic_data)
+        output_files = {"new_medal_tally.csv": summary_data}
+        for filename, rows in final_data.items():
+            if "paris" not in filename:
+                output_files[f"new_{filename}"] = rows
+        utils.write_csv_files(output_files)
+
+    stages.add(
+        "write_output",
+        write_output,
+        inputs=["olympic_data", "summary_data"],
+    )
+
+    stages.run()
+    if constants.STAGE_TIMINGS:
+        print("stage timings:")
+        stages.print_timings()
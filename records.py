@@ -0,0 +1,155 @@
+import keyword
+from operator import attrgetter
+
+# compact record objects for the rows of the keyed files in create_objects (athlete bios, countries, games, paris athletes)
+# a dict per row stores a hash table of its keys, a record type with __slots__ only stores the values
+# records act like the dicts they replace (record["name"], record.get("born", ""), "noc" in record, update, keys, ...)
+# so the later stages do not need to know the difference
+
+
+class Record:
+    __slots__ = ("_extra",)
+
+    # set on each record type by make_record_type
+    _fields = ()  # csv header names, in order
+    _slot_of = {}  # header name -> slot attribute name
+    _setters = ()  # slot setters in header order
+    _getters = {}  # header name -> slot getter
+    _values_getter = None  # reads every slot at once (as a tuple in _getters order), see make_fields_getter
+
+    def __init__(self, values: list[str]):
+        if len(values) > len(self._setters):
+            raise IndexError("row has more values than the header")
+        for setter, value in zip(self._setters, values):
+            setter(self, value)
+        # keys that are not in the header (ie "events" added in add_paris_objects) go here
+        self._extra = None
+
+    def __getitem__(self, key):
+        getter = self._getters.get(key)
+        if getter is not None:
+            try:
+                return getter(self)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key) -> bool:
+        slot = self._slot_of.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        getter = self._getters.get(key)
+        if getter is not None:
+            try:
+                return getter(self)
+            except AttributeError:
+                return default
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def keys(self) -> list[str]:
+        return [key for key, _ in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def values(self) -> list:
+        return [value for _, value in self.items()]
+
+    # the slots are read in one call when they all have a value (the usual case),
+    # otherwise one by one, skipping the slots without a value
+    def items(self) -> list[tuple]:
+        items = None
+        if self._values_getter is not None:
+            try:
+                items = list(zip(self._getters, self._values_getter(self)))
+            except AttributeError:
+                pass  # a slot without a value
+        if items is None:
+            items = []
+            for field, getter in self._getters.items():
+                try:
+                    items.append((field, getter(self)))
+                except AttributeError:
+                    pass
+        if self._extra is not None:
+            items.extend(self._extra.items())
+        return items
+
+    def update(self, other=(), **kwargs):
+        if hasattr(other, "keys"):
+            for key in other.keys():
+                self[key] = other[key]
+        else:
+            for key, value in other:
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    # printed the same way as the dict it replaces
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+# creates a record type with one slot per csv header column
+# headers that are not valid python names (ie "country flag") or that are the name of a Record method / attribute
+# (ie "items", a slot would replace the method) get a generated slot name
+def make_record_type(name: str, headers: list[str]) -> type:
+    slot_of = {}
+    for i, header in enumerate(headers):
+        slot = header if header.isidentifier() and not keyword.iskeyword(header) else ""
+        if not slot or slot in slot_of.values() or slot.startswith("_") or hasattr(Record, slot):
+            slot = f"_field_{i}"
+        slot_of[header] = slot
+
+    record_type = type(
+        name,
+        (Record,),
+        {"__slots__": tuple(slot_of.values()), "_fields": tuple(headers)},
+    )
+    record_type._slot_of = slot_of
+    record_type._setters = tuple(
+        getattr(record_type, slot_of[header]).__set__ for header in headers
+    )
+    record_type._getters = {
+        header: getattr(record_type, slot_of[header]).__get__ for header in headers
+    }
+    record_type._values_getter = make_fields_getter(record_type, list(record_type._getters))
+    return record_type
+
+
+# returns a function that reads the values of the given fields from a record of record_type as a tuple,
+# None if a field is not a slot of the record type
+# (the function raises AttributeError for a record that does not have a value for every field)
+def make_fields_getter(record_type: type, fields: list[str]):
+    slot_of = getattr(record_type, "_slot_of", None)
+    if slot_of is None or not fields or any(field not in slot_of for field in fields):
+        return None
+    getter = attrgetter(*[slot_of[field] for field in fields])
+    if len(fields) == 1:
+        return lambda record: (getter(record),)
+    return getter
+
@@ -0,0 +1,179 @@
+import io
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# small dependency scheduler for the stages of project.main
+# every stage names the values it reads (inputs) and the values it produces (outputs),
+# a stage starts as soon as all of its inputs exist, so stages without a data dependency run at the same time.
+# Stages run on threads since they share (and update) the same in-memory objects, they overlap where the work
+# releases the GIL (file reads / writes, hashing, (de)compression, worker processes)
+# the output printed by the stages comes out in the order the stages were added, so the log is the same as when
+# the stages run one after another: the first unfinished stage prints straight to stdout, stages that run ahead
+# of it are held back in a spool file (in memory up to SPOOL_SIZE, then on disk) until it is their turn
+
+SPOOL_SIZE = 1024 * 1024
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class Stage:
+    def __init__(self, name: str, func, inputs: tuple, outputs: tuple):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.start = None  # seconds since the start of the run
+        self.end = None
+        self.finished = False
+        self.spool = None  # what the stage printed while an earlier stage was still running
+
+
+# stand-in for sys.stdout while the stages run, see the top of the file
+class StageOutput(io.TextIOBase):
+    def __init__(self, stream, stages: list):
+        self.stream = stream
+        self.stages = stages
+        self.head = 0  # index of the first unfinished stage, its output goes straight to the stream
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        stage = getattr(self.local, "stage", None)
+        with self.lock:
+            if stage is None or stage is self.stages[self.head]:
+                return self.stream.write(text)
+            if stage.spool is None:
+                stage.spool = tempfile.SpooledTemporaryFile(
+                    max_size=SPOOL_SIZE, mode="w+", encoding="utf-8"
+                )
+            return stage.spool.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    # marks a stage as done (called from its thread), the output of the stages whose turn it is now is written out
+    def finish(self, stage: Stage):
+        with self.lock:
+            stage.finished = True
+            while self.head < len(self.stages):
+                head = self.stages[self.head]
+                self.write_spool(head)
+                if not head.finished:
+                    break
+                self.head += 1
+
+    # writes out and closes the spool of every stage that has one (ie after a failure)
+    def close_spools(self):
+        with self.lock:
+            for stage in self.stages[self.head :]:
+                self.write_spool(stage)
+
+    def write_spool(self, stage: Stage):
+        if stage.spool is None:
+            return
+        stage.spool.seek(0)
+        for chunk in iter(lambda: stage.spool.read(SPOOL_CHUNK_SIZE), ""):
+            self.stream.write(chunk)
+        stage.spool.close()
+        stage.spool = None
+
+
+class StageScheduler:
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers
+        self.stages = []
+        self.producers = {}  # {value name: stage}
+
+    # adds a stage, func is called with the input values (in order) and returns the value of its output,
+    # a tuple of values for several outputs, or nothing when it has no outputs (run raises ValueError when the
+    # number of values does not match the outputs)
+    # inputs have to be produced by a stage added before (or be passed to run), so the stages can not form a cycle
+    def add(self, name: str, func, inputs=(), outputs=()) -> Stage:
+        stage = Stage(name, func, tuple(inputs), tuple(outputs))
+        for output in stage.outputs:
+            if output in self.producers:
+                raise ValueError(f"{output} is already produced by {self.producers[output].name}")
+            self.producers[output] = stage
+        self.stages.append(stage)
+        return stage
+
+    # runs every stage, values holds the inputs that are not produced by a stage
+    # a value is dropped once every stage that reads it is done, returns the values that no stage reads
+    def run(self, values: dict | None = None) -> dict:
+        values = dict(values or {})
+        for stage in self.stages:
+            for name in stage.inputs:
+                producer = self.producers.get(name)
+                if name not in values and (
+                    producer is None or self.stages.index(producer) >= self.stages.index(stage)
+                ):
+                    raise ValueError(f"stage {stage.name} reads {name} before it is produced")
+        readers = {}
+        for stage in self.stages:
+            for name in stage.inputs:
+                readers[name] = readers.get(name, 0) + 1
+
+        self.start_time = time.perf_counter()
+        pending = list(self.stages)
+        running = {}
+        stdout = sys.stdout
+        sys.stdout = output = StageOutput(stdout, self.stages)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while pending or running:
+                    for stage in [s for s in pending if all(n in values for n in s.inputs)]:
+                        pending.remove(stage)
+                        args = [values[name] for name in stage.inputs]
+                        running[pool.submit(self.run_stage, stage, args, output)] = stage
+                    if not running:
+                        # the inputs of the pending stages can no longer be produced
+                        missing = sorted({n for s in pending for n in s.inputs if n not in values})
+                        raise RuntimeError(
+                            f"stages {[s.name for s in pending]} wait for {missing}, "
+                            "which no stage produced"
+                        )
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        result = future.result()
+                        if len(stage.outputs) == 1:
+                            result = (result,)
+                        elif result is None:
+                            result = ()
+                        if len(result) != len(stage.outputs):
+                            raise ValueError(
+                                f"stage {stage.name} returned {len(result)} values "
+                                f"for its outputs {list(stage.outputs)}"
+                            )
+                        values.update(zip(stage.outputs, result))
+                        for name in stage.inputs:
+                            readers[name] -= 1
+                            if readers[name] == 0:
+                                values.pop(name, None)
+        finally:
+            sys.stdout = stdout
+            # the held back output of the stages that ran before a failure
+            output.close_spools()
+        return values
+
+    def run_stage(self, stage: Stage, args: list, output: StageOutput):
+        output.local.stage = stage
+        stage.start = time.perf_counter() - self.start_time
+        try:
+            return stage.func(*args)
+        finally:
+            stage.end = time.perf_counter() - self.start_time
+            output.local.stage = None
+            output.finish(stage)
+
+    # start / end time of every stage (seconds since the start of the run)
+    def print_timings(self):
+        for stage in self.stages:
+            if stage.end is not None:
+                print(
+                    f"  {stage.name:<24} {stage.start:8.3f} -> {stage.end:8.3f}"
+                    f"  ({stage.end - stage.start:.3f}s)"
+                )
@@ -0,0 +1,60 @@
+from operator import itemgetter
+
+# column layout of a csv file, built once from its header row (see utils.register_schema)
+# columns are looked up by name, so the stages keep working when the columns of an input file are reordered
+# the accessors are operator.itemgetter objects made once per set of columns, reading the columns of a row
+# is then a single call instead of an index lookup + subscript per column
+
+
+class Schema:
+    def __init__(self, header: list[str]):
+        self.header = tuple(header)
+        self.positions = {}  # {column name: index}, the first column wins for repeated names (like list.index)
+        for i, name in enumerate(self.header):
+            self.positions.setdefault(name, i)
+        self.extractors = {}  # {column names: itemgetter}
+
+    def __len__(self) -> int:
+        return len(self.header)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.positions
+
+    # index of a column, raises ValueError if the column is not in the header
+    def index(self, name: str) -> int:
+        try:
+            return self.positions[name]
+        except KeyError:
+            raise ValueError(f"column {name} is not in the header {list(self.header)}") from None
+
+    # index of a column, -1 if the column is not in the header
+    def find(self, name: str) -> int:
+        return self.positions.get(name, -1)
+
+    def indices(self, *names: str) -> tuple[int, ...]:
+        return tuple(self.index(name) for name in names)
+
+    # row length needed to read the given columns
+    def width(self, *names: str) -> int:
+        return max(self.indices(*names)) + 1
+
+    # returns a function that reads one column of a row
+    def getter(self, name: str):
+        return itemgetter(self.index(name))
+
+    # returns a function that reads the given columns of a row as a tuple (a tuple even for a single column),
+    # raises IndexError for a row that is too short
+    def extractor(self, *names: str):
+        extractor = self.extractors.get(names)
+        if extractor is None:
+            getter = itemgetter(*self.indices(*names))
+            extractor = (lambda row: (getter(row),)) if len(names) == 1 else getter
+            self.extractors[names] = extractor
+        return extractor
+
+    # builds a row in header order from {column name: value}, columns that are not given are left empty
+    def make_row(self, values: dict) -> list:
+        unknown = [name for name in values if name not in self.positions]
+        if unknown:
+            raise ValueError(f"columns {unknown} are not in the header {list(self.header)}")
+        return [values.get(name, "") for name in self.header]
@@ -1,8 +1,28 @@
 # supports the use of csv library
 import csv
 
+import ast
+import bz2
+import gc
+import gzip
+import hashlib
+import io
+import lzma
+import marshal
+import os
 import re
+import sys
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import constants
+from event_results_table import EventResultsTable
+from noc_registry import NocRegistry
+from schema import Schema
 from special_character_map import CHARACTER_MAP
 
 # this global variable will be set once the highest id value is found
@@ -11,27 +31,383 @@ next_ids = {}
 # this is populated and used in runtime
 athlete_edition_map = {}
 
+# secondary index over the athlete bio objects: {int athlete_id: athlete object}
+# set with build_athlete_index and kept in sync with add_to_athlete_index when athletes are added
+# (athlete ids are unique in the bio file, new paris athletes get fresh ids)
+athlete_index = {}
+# the athlete bio dict athlete_index was built from (see ensure_athlete_index)
+athlete_index_source = None
+
+# NOC codes and country names of olympics_country.csv and paris/nocs.csv, filled by jobs.combine_nocs
+noc_registry = NocRegistry()
+
+# column schemas of the input files {file name: Schema}, registered from the csv header when the files are parsed
+# (jobs.parse_data), the stages read columns by name through them instead of fixed positions
+schemas = {}
+
+# one copy of every categorical value (ie "2024 Summer Olympics", "USA", "Gold") shared by all tables of a run
+string_pool = {}
+
+# registers the schema of an input file from its header row
+def register_schema(file_name: str, header: list[str]) -> Schema:
+    schemas[file_name] = Schema(header)
+    return schemas[file_name]
+
+
+# returns the schema of an input file, a file that was not read through parse_data gets one
+# from the header of its rows (a list of rows or an EventResultsTable)
+def get_schema(file_name: str, rows=None) -> Schema:
+    schema = schemas.get(file_name)
+    if schema is None:
+        if rows is None or not len(rows):
+            raise KeyError(f"no schema registered for {file_name}")
+        header = rows.header if isinstance(rows, EventResultsTable) else rows[0]
+        schema = register_schema(file_name, header)
+    return schema
+
+
+# compressed csv files are detected from their extension
+COMPRESSED_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
 
 # This function reads a csv file and return a list of lists
 # each element of the returned list is a row in the csv file
 # The first row is the header row
 def read_csv_file(file_name):
-    data_set = []
-    with open(file_name, mode="r", encoding="utf-8-sig") as file:
+    return list(iter_csv_file(file_name))
+
+
+# This function lazily reads a csv file, yielding one row (list of strings) at a time
+# The first row yielded is the header row
+# used for files that are only scanned once so the full list never has to be held in memory
+def iter_csv_file(file_name):
+    with open_csv_file(file_name) as file:
         csv_reader = csv.reader(file)
         for row in csv_reader:
-            data_set.append(row)
-    return data_set
+            yield row
+
+
+# replaces the values of the given columns with the shared copy from string_pool, in place
+# rows is a list of lists where the first row is the header, columns that are not in the header are ignored
+def intern_columns(rows: list[list[str]], column_names: list[str]) -> list[list[str]]:
+    if not rows:
+        return rows
+    indices = [rows[0].index(name) for name in column_names if name in rows[0]]
+    pool = string_pool.setdefault
+    for row in rows[1:]:
+        for i in indices:
+            if i < len(row):
+                row[i] = pool(row[i], row[i])
+    return rows
+
+
+# same as intern_columns for a lazy row iterator, rows are interned as they pass through
+def iter_interned(rows, column_names: list[str]):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    yield header
+    indices = [header.index(name) for name in column_names if name in header]
+    pool = string_pool.setdefault
+    for row in rows:
+        for i in indices:
+            if i < len(row):
+                row[i] = pool(row[i], row[i])
+        yield row
+
+
+# splits a path to a file inside a zip archive, ie "dataset.zip/paris/athletes.csv"
+# returns (archive, member) or (None, file_name) if the path is not inside an archive
+def split_archive_path(file_name: str) -> tuple[str | None, str]:
+    index = file_name.find(".zip/")
+    if index == -1:
+        return None, file_name
+    return file_name[: index + 4], file_name[index + 5 :]
+
+
+# opens a csv file in text mode for reading ("r") or writing ("w")
+# .gz / .xz / .bz2 files are (de)compressed while streaming and zip archive members can be read directly
+def open_csv_file(file_name: str, mode: str = "r"):
+    archive, member = split_archive_path(file_name)
+    if archive:
+        if mode != "r":
+            raise ValueError(f"cannot write into a zip archive: {file_name}")
+        with zipfile.ZipFile(archive) as zip_file:
+            # the opened member stays readable after the archive handle is closed
+            member_file = zip_file.open(member)
+        return io.TextIOWrapper(member_file, encoding="utf-8-sig")
+
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(file_name)[1])
+    if mode == "r":
+        if opener:
+            return opener(file_name, mode="rt", encoding="utf-8-sig")
+        return open(file_name, mode="r", encoding="utf-8-sig")
+    if opener:
+        return opener(file_name, mode="wt", newline="", encoding="utf-8-sig")
+    return open(
+        file_name,
+        mode="w",
+        newline="",
+        encoding="utf-8-sig",
+        buffering=constants.WRITE_BUFFER_SIZE,
+    )
+
+
+# finds the file to read for an input csv, the returned path keeps the original name as a suffix
+# if archive is given the file is read from inside that zip archive,
+# otherwise a compressed copy (ie olympics_games.csv.gz) is used when the plain csv file is missing
+def find_input_file(file_name: str, archive: str | None = None) -> str:
+    if archive:
+        return f"{archive}/{file_name}"
+    if not os.path.exists(file_name):
+        for extension in COMPRESSED_OPENERS:
+            if os.path.exists(file_name + extension):
+                return file_name + extension
+    return file_name
+
+
+# returns a fingerprint of a csv file built from its path, size, mtime and content hash
+# (plus the python version since the cache entries are marshal dumps)
+def csv_fingerprint(file_name: str) -> str:
+    archive, member = split_archive_path(file_name)
+    if archive:
+        # the zip archive already stores a crc32 and size of each member
+        stat = os.stat(archive)
+        with zipfile.ZipFile(archive) as zip_file:
+            info = zip_file.getinfo(member)
+        content = f"{info.CRC:08x}-{info.file_size}"
+    else:
+        stat = os.stat(file_name)
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(file_name, mode="rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                content_hash.update(chunk)
+        content = content_hash.hexdigest()
+    key = "|".join(
+        [
+            os.path.abspath(file_name),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            content,
+            str(sys.version_info[:2]),
+        ]
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+# path of the cache entry of a parsed csv file, named "<path hash>-<fingerprint>.rows",
+# so a changed file misses the cache and gets re-parsed
+def csv_cache_entry(file_name: str, cache_dir: str | None = None) -> str:
+    if cache_dir is None:
+        cache_dir = constants.CSV_CACHE_DIR
+    path_hash = hashlib.blake2b(
+        os.path.abspath(file_name).encode(), digest_size=8
+    ).hexdigest()
+    return os.path.join(cache_dir, f"{path_hash}-{csv_fingerprint(file_name)}.rows")
+
+
+# same as read_csv_file but goes through an on-disk cache of already parsed files (see iter_csv_file_cached)
+def read_csv_file_cached(
+    file_name: str,
+    cache_dir: str | None = None,
+    max_bytes: int | None = None,
+    entry: str | None = None,
+) -> list[list[str]]:
+    # building millions of small lists triggers the cyclic gc over and over, it is paused while loading
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(iter_csv_file_cached(file_name, cache_dir, max_bytes, entry))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+# same as iter_csv_file but goes through an on-disk cache of already parsed files
+# an entry holds the rows in marshal dumped chunks of constants.CSV_CACHE_CHUNK_ROWS rows, so a lazy reader only
+# holds one chunk at a time. A missing entry is written while the csv file is parsed (it only replaces the stale
+# entries of the file once every row was read). The cache is capped at max_bytes, least recently used entries go first
+# entry can be passed when it is already known (see cache_csv_file)
+def iter_csv_file_cached(
+    file_name: str,
+    cache_dir: str | None = None,
+    max_bytes: int | None = None,
+    entry: str | None = None,
+):
+    if entry is None:
+        entry = csv_cache_entry(file_name, cache_dir)
+    count = 0  # rows yielded from the entry
+    if os.path.exists(entry):
+        try:
+            for chunk in iter_cache_chunks(entry):
+                yield from chunk
+                count += len(chunk)
+            return
+        except (OSError, EOFError, ValueError, TypeError):
+            # unreadable entry, it is rebuilt below (the rows that were already yielded are skipped)
+            remove_cache_entry(entry)
+    yield from islice(write_csv_cache_entry(file_name, entry, max_bytes), count, None)
+
+
+# parses a csv file into its cache entry (unless it is already cached) and returns the entry,
+# used to parse a file in a worker process while the parent reads the rows from the entry
+def cache_csv_file(
+    file_name: str, cache_dir: str | None = None, max_bytes: int | None = None
+) -> str:
+    entry = csv_cache_entry(file_name, cache_dir)
+    if not os.path.exists(entry):
+        deque(write_csv_cache_entry(file_name, entry, max_bytes), maxlen=0)
+    return entry
+
+
+# each chunk is stored as its length (8 bytes) followed by the marshal dump of its rows
+def iter_cache_chunks(entry: str):
+    with open(entry, mode="rb") as file:
+        os.utime(entry)  # mark as recently used
+        while header := file.read(8):
+            size = int.from_bytes(header, "little")
+            data = file.read(size)
+            if len(header) != 8 or len(data) != size:
+                raise EOFError(f"truncated cache entry: {entry}")
+            # loading many small lists triggers the cyclic gc over and over, it is paused while loading
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                chunk = marshal.loads(data)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            yield chunk
+
+
+# yields the rows of a csv file while writing them into the cache entry
+def write_csv_cache_entry(file_name: str, entry: str, max_bytes: int | None = None):
+    if max_bytes is None:
+        max_bytes = constants.CSV_CACHE_MAX_BYTES
+    cache_dir = os.path.dirname(entry)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_entry = f"{entry}.{os.getpid()}.tmp"
+    written = False
+    try:
+        with open(temp_entry, mode="wb") as file:
+            rows = iter_csv_file(file_name)
+            while chunk := list(islice(rows, constants.CSV_CACHE_CHUNK_ROWS)):
+                data = marshal.dumps(chunk)
+                file.write(len(data).to_bytes(8, "little"))
+                file.write(data)
+                yield from chunk
+
+        # the stale entries of the file (the ones of its older versions), temp files of other writers are kept
+        prefix = os.path.basename(entry).split("-")[0] + "-"
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and not name.endswith(".tmp"):
+                remove_cache_entry(os.path.join(cache_dir, name))
+        os.replace(temp_entry, entry)
+        written = True
+        evict_cache_entries(cache_dir, max_bytes)
+    finally:
+        if not written:
+            remove_cache_entry(temp_entry)
+
+
+# removes cache entries (oldest use first) until the cache directory is at most max_bytes
+def evict_cache_entries(cache_dir: str, max_bytes: int):
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".rows"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove_cache_entry(path)
+        total -= size
+
+
+def remove_cache_entry(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # already removed by another reader
+
+
+# returns a short stable hash of a csv row (python's hash() changes between runs)
+def hash_row(row: list[str]) -> bytes:
+    return hashlib.blake2b("\x1f".join(row).encode(), digest_size=12).digest()
+
+
+# loads a marshal manifest written by save_manifest, returns None if it is missing or unreadable
+def load_manifest(file_name: str):
+    if not os.path.exists(file_name):
+        return None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(file_name, mode="rb") as file:
+            return marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def save_manifest(file_name: str, manifest: dict):
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+    temp_file = f"{file_name}.{os.getpid()}.tmp"
+    with open(temp_file, mode="wb") as file:
+        file.write(marshal.dumps(manifest))
+    os.replace(temp_file, file_name)
 
 
 # This function writes out a list of lists to a csv file.
 # each element of the list is a row in the csv file
 # The first row is the header row
+# data_set can be any iterable of rows, writerows consumes it directly (no extra copy)
+# and a large write buffer keeps the number of write calls low
+# file names ending in .gz / .xz / .bz2 are compressed while writing
 def write_csv_file(file_name, data_set):
-    with open(file_name, mode="w", newline="", encoding="utf-8-sig") as file:
+    with open_csv_file(file_name, mode="w") as file:
         csv_writer = csv.writer(file)
-        for row in data_set:
-            csv_writer.writerow(row)
+        csv_writer.writerows(data_set)
+
+
+# writes several csv files at the same time, accepts {file_name: rows}
+# writing is mostly waiting on the disk, so the files are written on threads
+def write_csv_files(files: dict, max_workers: int | None = None):
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(write_csv_file, file_name, rows)
+            for file_name, rows in files.items()
+        ]
+        for future in futures:
+            future.result()  # re-raises any error from the writer threads
+
+
+# calls func on chunks of chunk_size rows in a pool of worker processes, yields the results in chunk order
+# at most 2 chunks per worker are in flight, so a lazy row iterator is never read far ahead
+# initializer(*initargs) runs once in every worker (ie to set data that all chunks need)
+def map_chunks(func, rows, chunk_size: int, workers: int, initializer=None, initargs=()):
+    rows = iter(rows)
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    ) as pool:
+        in_flight = deque(pool.submit(func, chunk) for chunk in islice(chunks, 2 * workers))
+        while in_flight:
+            future = in_flight.popleft()
+            for chunk in islice(chunks, 1):
+                in_flight.append(pool.submit(func, chunk))
+            yield future.result()
 
 
 # creates a unique identifier (key) from each object type using specific row values
@@ -53,96 +429,401 @@ def create_unique_id(
     return out
 
 
+# translation table for str.translate, built once from CHARACTER_MAP
+NAME_TRANSLATION = str.maketrans(CHARACTER_MAP)
+
+
 # Normalizes the special accented characters for the athlete names
-def normalize_name(name: str):
-    out = ""
-    for ch in name:
-        try:
-            ch = CHARACTER_MAP[ch]
-        except KeyError:
-            pass
-        out += ch
+# names repeat a lot in the bio file, normalized names are memoized (up to constants.NAME_CACHE_SIZE)
+def normalize_name(name: str) -> str:
+    return normalize_name_cached(name, constants.NAME_DECOMPOSITION_FALLBACK)
+
+
+@lru_cache(maxsize=constants.NAME_CACHE_SIZE)
+def normalize_name_cached(name: str, decompose: bool = False) -> str:
+    if name.isascii():
+        return name
+    out = name.translate(NAME_TRANSLATION)
+    if decompose and not out.isascii():
+        out = "".join(map(decompose_character, out))
     return out
 
 
+# normalizes a whole column of names, each distinct name is normalized once (without going through the memo)
+def normalize_names(names) -> list[str]:
+    names = list(names)
+    normalize = normalize_name_cached.__wrapped__
+    decompose = constants.NAME_DECOMPOSITION_FALLBACK
+    normalized = {name: normalize(name, decompose) for name in set(names)}
+    return list(map(normalized.__getitem__, names))
+
+
+# fallback for characters that are not in CHARACTER_MAP, ie "ő" -> "o" (the base letter without its accents)
+# characters without an ascii base letter are kept
+def decompose_character(ch: str) -> str:
+    if ch.isascii():
+        return ch
+    base = "".join(
+        c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c)
+    )
+    return base if base.isascii() and base else ch
+
+
 def convert_paris_to_normal_name(name: str) -> str:
     non_tv_name = name.split(" ")
     return " ".join([non_tv_name[-1]] + non_tv_name[:-1])
 
 
 def create_athlete_edition_id_map(
-    event_data: list[list[str]], editions: list[list[str]]
+    event_data: list[list[str]] | EventResultsTable,
+    editions: list[list[str]],
 ):
     global athlete_edition_map
 
-    edition_year_idx = 3
-    edition_id_idx = 1
-    edition_map = {}
-    for row in editions[1:]:
-        edition_map[row[edition_id_idx]] = row[edition_year_idx]
+    games = get_schema(constants.OLYMPIC_PATHS.GAMES, editions)
+    edition_map = dict(map(games.extractor("edition_id", "year"), editions[1:]))
+
+    results = get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS, event_data)
+    columns = results.indices("athlete_id", "edition_id")
+    if isinstance(event_data, EventResultsTable):
+        pairs = zip(*map(event_data.column_values, columns))
+    else:
+        rows = iter(event_data)
+        next(rows, None)  # skip the header row
+        pairs = map(results.extractor("athlete_id", "edition_id"), rows)
+    for athlete_id, edition_id in pairs:
+        if athlete_id not in athlete_edition_map:
+            athlete_edition_map[athlete_id] = edition_map[edition_id]
+
+
+# returns the athlete id as an int (the index key), None if it is not a number
+def athlete_id_key(athlete_id) -> int | None:
+    try:
+        return int(athlete_id)
+    except (TypeError, ValueError):
+        return None
+
+
+# (re)builds the athlete id index from the athlete bio objects {unique_id: athlete}
+def build_athlete_index(athletes: dict) -> dict:
+    global athlete_index, athlete_index_source
+    athlete_index.clear()
+    for athlete in athletes.values():
+        add_to_athlete_index(athlete)
+    athlete_index_source = athletes
+    return athlete_index
+
+
+# builds the athlete id index from the athlete bio objects unless it was already built from that same dict
+# (an index that is not empty may hold the athletes of another run, or only the ones add_paris_objects added)
+def ensure_athlete_index(athletes: dict) -> dict:
+    if athlete_index_source is not athletes:
+        build_athlete_index(athletes)
+    return athlete_index
+
+
+def add_to_athlete_index(athlete) -> None:
+    key = athlete_id_key(athlete.get("athlete_id"))
+    if key is not None:
+        athlete_index[key] = athlete
+
+
+# returns the athlete object for an athlete id (int or str), None if it is not in the index
+def get_athlete(athlete_id):
+    key = athlete_id_key(athlete_id)
+    if key is None:
+        return None
+    return athlete_index.get(key)
+
+
+DATE_OUTPUT_FORMAT = "%d-%b-%Y"
+MONTH_ABBREVIATIONS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MONTH_NUMBERS = {
+    name: i + 1
+    for i, name in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"]
+    )
+}
+ABBREVIATED_MONTH_NUMBERS = {name.lower(): i + 1 for i, name in enumerate(MONTH_ABBREVIATIONS)}
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# two digit years, the century is predicted from the athlete's first edition (see predict_date)
+DAY_MONTH_SHORT_YEAR = re.compile(r"^(\d{1,2})-([A-Za-z]{3})-(\d{2})$")
+MONTH_SHORT_YEAR = re.compile(r"^([A-Za-z]{3})-(\d{2})$")
+FOUR_DIGIT_YEAR = re.compile(r"\d{4}")
+# the normalize_date output format ("12-Mar-1985")
+DAY_MONTH_ABBREVIATION_YEAR = re.compile(r"([0-9]{1,2})-([A-Za-z]{3})-([0-9]{4})")
 
-    athlete_id_idx = 7
-    edition_id_idx = 1
-    for row in event_data[1:]:
-        if row[athlete_id_idx] not in athlete_edition_map:
-            athlete_edition_map[row[athlete_id_idx]] = edition_map[row[edition_id_idx]]
+
+def is_leap_year(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+# returns "dd-Mon-yyyy" for a valid date, None otherwise (the date is then left to the strptime formats)
+# only years from 1000 are handled here so the output is the same as strftime's
+def format_date(year: int, month: int | None, day: int) -> str | None:
+    if not is_valid_date(year, month, day):
+        return None
+    return f"{day:02d}-{MONTH_ABBREVIATIONS[month - 1]}-{year}"
+
+
+def is_valid_date(year: int, month: int | None, day: int) -> bool:
+    if month is None or not 1000 <= year <= 9999 or not 1 <= month <= 12 or day < 1:
+        return False
+    if month == 2 and day == 29:
+        return is_leap_year(year)
+    return day <= DAYS_IN_MONTH[month - 1]
+
+
+# parsers for the common date shapes, each returns the same value as the first strptime format in
+# normalize_date that accepts the string, or None to fall back to the formats
+# "12 March 1985" (%d %B %Y)
+def parse_day_month_name_year(match) -> str | None:
+    day, month, year = match.groups()
+    return format_date(int(year), MONTH_NUMBERS.get(month.lower()), int(day))
+
+
+# "1985-03-12" (%Y-%m-%d)
+def parse_iso_date(match) -> str | None:
+    year, month, day = match.groups()
+    return format_date(int(year), int(month), int(day))
+
+
+# "12-Mar-1985" (%d-%b-%Y)
+def parse_day_month_abbreviation_year(match) -> str | None:
+    day, month, year = match.groups()
+    return format_date(int(year), ABBREVIATED_MONTH_NUMBERS.get(month.lower()), int(day))
+
+
+# "March 1985" (%B %Y)
+def parse_month_name_year(match) -> str | None:
+    month, year = match.groups()
+    return format_date(int(year), MONTH_NUMBERS.get(month.lower()), 1)
+
+
+# "1985"
+def parse_year(match) -> str | None:
+    return format_date(int(match.group(0)), 1, 1)
+
+
+# the shapes are mutually exclusive, a date string is sent to at most one parser
+DATE_SHAPES = [
+    (re.compile(r"([0-9]{4})"), parse_year),
+    (re.compile(r"([0-9]{1,2}) ([A-Za-z]+) ([0-9]{4})"), parse_day_month_name_year),
+    (re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})"), parse_iso_date),
+    (DAY_MONTH_ABBREVIATION_YEAR, parse_day_month_abbreviation_year),
+    (re.compile(r"([A-Za-z]+) ([0-9]{4})"), parse_month_name_year),
+]
 
 
 # Normalizes the special dates
+# birth dates repeat a lot, the parsed dates are memoized (parse_date and predict_date)
 def normalize_date(date_str: str, athlete_id: int | None = None) -> str:
     global athlete_edition_map
-    output_format = "%d-%b-%Y"
     date_str = date_str.strip()
     if not date_str:
         return ""
 
-    def predict_prefix(day: str, mon: str, year: str, athlete_id: int) -> str:
-        edition_year = athlete_edition_map[str(athlete_id)]
-        prefix = 20
-        while int(edition_year) <= int(f"{prefix}{year}"):
-            prefix -= 1
+    if athlete_id is not None:
+        first_match_text = DAY_MONTH_SHORT_YEAR.search(date_str)
+        if first_match_text:
+            day, mon, year = first_match_text.groups()
+            return predict_date(day, mon, year, athlete_edition_map[str(athlete_id)])
 
-        return datetime.strptime(f"{day}-{mon}-{prefix}{year}", "%d-%b-%Y").strftime(
-            output_format
-        )
+        second_match_text = MONTH_SHORT_YEAR.search(date_str)
+        if second_match_text:
+            mon, year = second_match_text.groups()
+            return predict_date("01", mon, year, athlete_edition_map[str(athlete_id)])
 
-    if date_str.isdigit() and len(date_str) == 4:
-        return datetime(int(date_str), 1, 1).strftime(output_format)
+    date = parse_date(date_str)
+    if not date:
+        print("invalid date:", date_str)
+    return date
+
+
+# two digit year, the century is the latest one that puts the birth year before the athlete's first edition
+@lru_cache(maxsize=constants.DATE_CACHE_SIZE)
+def predict_date(day: str, mon: str, year: str, edition_year) -> str:
+    prefix = 20
+    while int(edition_year) <= int(f"{prefix}{year}"):
+        prefix -= 1
 
-    first_match_text = re.search(r"^(\d{1,2})-([A-Za-z]{3})-(\d{2})$", date_str)
-    if first_match_text and athlete_id is not None:
-        day, mon, year = first_match_text.groups()
-        return predict_prefix(day, mon, year, athlete_id)
+    return datetime.strptime(f"{day}-{mon}-{prefix}{year}", "%d-%b-%Y").strftime(
+        DATE_OUTPUT_FORMAT
+    )
 
-    second_match_text = re.search(r"^([A-Za-z]{3})-(\d{2})$", date_str)
-    if second_match_text and athlete_id is not None:
-        mon, year = second_match_text.groups()
-        return predict_prefix("01", mon, year, athlete_id)
+
+# parses a (stripped) date string that does not depend on the athlete, "" if it is not a date
+@lru_cache(maxsize=constants.DATE_CACHE_SIZE)
+def parse_date(date_str: str) -> str:
+    for shape, parser in DATE_SHAPES:
+        match = shape.fullmatch(date_str)
+        if match:
+            date = parser(match)
+            if date is not None:
+                return date
+            break
+
+    if date_str.isdigit() and len(date_str) == 4:
+        return datetime(int(date_str), 1, 1).strftime(DATE_OUTPUT_FORMAT)
 
     formats = ["%d %B %Y", "%Y-%m-%d", "%d-%b-%Y", "%B %Y", "%b %d, %Y", "%d-%m-%Y"]
     for fmt in formats:
         try:
-            return datetime.strptime(date_str, fmt).strftime(output_format)
+            return datetime.strptime(date_str, fmt).strftime(DATE_OUTPUT_FORMAT)
         except ValueError:
             continue
 
     # final try if it still has not been parsed, but has a year in it, we use that (arbitrarily chose the largest)
-    matches = re.findall(r"\d{4}", date_str)
+    matches = FOUR_DIGIT_YEAR.findall(date_str)
     if len(matches) > 0:
         return datetime(max([int(match) for match in matches]), 1, 1).strftime(
-            output_format
+            DATE_OUTPUT_FORMAT
         )
 
-    print("invalid date:", date_str)
     return ""
 
 
+# parses a date in the normalize_date output format into (year, month, day), None if it is not a valid date
+# (accepts the same dates as datetime.strptime(date_str, "%d-%b-%Y"), the uncommon ones are left to strptime)
+@lru_cache(maxsize=constants.DATE_CACHE_SIZE)
+def parse_output_date(date_str: str) -> tuple[int, int, int] | None:
+    match = DAY_MONTH_ABBREVIATION_YEAR.fullmatch(date_str)
+    if match:
+        day, month, year = match.groups()
+        date = (int(year), ABBREVIATED_MONTH_NUMBERS.get(month.lower()), int(day))
+        if is_valid_date(*date):
+            return date
+    try:
+        date = datetime.strptime(date_str, DATE_OUTPUT_FORMAT)
+    except ValueError:
+        return None
+    return date.year, date.month, date.day
+
+
+# ages of the athletes at the end of an edition (see jobs.add_additional_info)
+# the end date of every edition is parsed once and the age of an (athlete, edition) pair is computed once,
+# athletes have many results in the same edition
+# the birth dates are looked up in the athlete id index (athlete_index) the first time an athlete is seen,
+# or in births ({athlete id: born}) when it is given (ie in a worker process without the athlete objects)
+class AgeEngine:
+    def __init__(
+        self, games: dict, results_schema: Schema | None = None, births: dict | None = None
+    ):
+        self.games = games
+        self.births = births
+        if results_schema is None:
+            results_schema = get_schema(constants.OLYMPIC_PATHS.EVENT_RESULTS)
+        # reads the (athlete id, edition id) of an event results row
+        self.row_ids = results_schema.extractor("athlete_id", "edition_id")
+        self.birth_dates = {}  # {athlete id: (year, month, day), None if the birth date is unknown}
+        self.end_dates = {}  # {edition id: (year, month, day), None if the end date is not a date}
+        self.ages = {}  # {(athlete id, edition id): age}
+
+    # returns the age (as a string), "" if the birth date or the end date is unknown or the age is not believable
+    # raises KeyError for an edition that is not in the games
+    def get_age(self, aid: str, eid: str) -> str:
+        age = self.ages.get((aid, eid))
+        if age is None:
+            age = self.ages[(aid, eid)] = self.compute_age(aid, eid)
+        return age
+
+    # ages for (athlete id, edition id) pairs, in order
+    def get_ages(self, pairs) -> list[str]:
+        ages = self.ages
+        out = []
+        for pair in pairs:
+            age = ages.get(pair)
+            if age is None:
+                age = ages[pair] = self.compute_age(*pair)
+            out.append(age)
+        return out
+
+    # appends the age to an event results row, "" if the row is too short
+    def append_age(self, row: list):
+        try:
+            aid, eid = self.row_ids(row)
+        except IndexError:
+            row.append("")
+            return
+        pair = (str(aid), str(eid))
+        age = self.ages.get(pair)
+        if age is None:
+            age = self.ages[pair] = self.compute_age(*pair)
+        row.append(age)
+
+    def get_birth_date(self, aid: str) -> tuple[int, int, int] | None:
+        if aid in self.birth_dates:
+            return self.birth_dates[aid]
+        birth_date = None
+        if self.births is not None:
+            born = self.births.get(aid, "")
+            if born:
+                birth_date = parse_output_date(born)
+        else:
+            athlete = get_athlete(aid)
+            if athlete is not None and str(athlete.get("athlete_id")) == aid:
+                born = athlete.get("born", "")
+                if born:
+                    birth_date = parse_output_date(born)
+        self.birth_dates[aid] = birth_date
+        return birth_date
+
+    def get_end_date(self, eid: str) -> tuple[int, int, int] | None:
+        if eid not in self.end_dates:
+            self.end_dates[eid] = parse_output_date(self.games[eid]["end_date"])
+        return self.end_dates[eid]
+
+    def compute_age(self, aid: str, eid: str) -> str:
+        birth_date = self.get_birth_date(aid)
+        if birth_date is None:
+            return ""
+        end_date = self.get_end_date(eid)
+        if end_date is None:
+            return ""
+
+        birth_year, birth_month, birth_day = birth_date
+        end_year, end_month, end_day = end_date
+        # feb 29 birthdays are on feb 28 in non-leap years
+        if birth_month == 2 and birth_day == 29 and not is_leap_year(end_year):
+            birth_day = 28
+        age = end_year - birth_year - ((birth_month, birth_day) > (end_month, end_day))
+        # This prevents "negative ages" or "200 year olds" from lowering the data score
+        if 10 <= age <= 99:
+            return str(age)
+        return ""
+
+
+# runs the per-row operations of several stages in one loop over the rows (see jobs.process_event_results)
+# every operation is called with the row, in the order the operations were added
+class RowPipeline:
+    def __init__(self, operations=()):
+        self.operations = list(operations)
+
+    def add(self, operation) -> "RowPipeline":
+        self.operations.append(operation)
+        return self
+
+    def run(self, rows):
+        operations = self.operations
+        for row in rows:
+            for operation in operations:
+                operation(row)
+
+
 # finds the maximum athlete id and sets global id tracker
 def find_next_id(data: list[list[str]], key: str, index: int) -> int:
     global next_ids
     maximum = 0
-    for i in range(1, len(data)):
-        id = int(data[i][index])
+    if isinstance(data, EventResultsTable):
+        ids = data.column_values(index)
+    else:
+        rows = iter(data)
+        next(rows, None)  # skip the header row
+        ids = (row[index] for row in rows)
+    for id in ids:
+        id = int(id)
         if id > maximum:
             maximum = id
 
@@ -150,6 +831,25 @@ def find_next_id(data: list[list[str]], key: str, index: int) -> int:
     return next_ids[key]
 
 
+# same as find_next_id but for lazily read rows, each row is passed through unchanged
+# so the max id is found during a pass that is already happening (ie create_objects)
+# the global id tracker is set once the rows are exhausted
+def track_next_id(data, key: str, index: int):
+    global next_ids
+    maximum = 0
+    rows = iter(data)
+    header = next(rows, None)
+    if header is not None:
+        yield header
+    for row in rows:
+        id = int(row[index])
+        if id > maximum:
+            maximum = id
+        yield row
+
+    next_ids[key] = maximum + 1
+
+
 # gets a new athlete id and increments the global tracker
 def get_next_id(key) -> int:
     global next_ids
@@ -192,3 +892,191 @@ def get_name_permutations(name: list[str]) -> list[str]:
         return [" ".join([name[0]] + permutation) for permutation in permutations]
     else:
         return [" ".join(name)]
+
+
+# splits the surnames of a name into single tokens ("anne-marie" -> "anne", "marie"), as in get_name_permutations
+def split_surname_tokens(name: list[str]) -> list[str]:
+    tokens = []
+    for word in name[1:]:
+        if "-" in word:
+            tokens += word.split("-")
+        else:
+            tokens.append(word)
+    return tokens
+
+
+# matches athlete keys ("name,noc") whose surnames are reordered / partly missing / unhyphenated,
+# gives the same match as probing the keys from get_name_permutations in order
+# names with up to PROBED_SURNAME_TOKENS surname tokens are probed directly (at most 15 permutations), longer
+# names go through an inverted token index that is built the first time it is needed, so the number of lookups
+# does not grow with the factorial of the number of surnames
+class NameTokenIndex:
+    PROBED_SURNAME_TOKENS = 3
+
+    def __init__(self, athletes: dict):
+        self.athletes = athletes
+        self.index = None
+
+    # the keys are blocked by everything after the name (the noc) and the first name:
+    # {(noc part of the key, first name, surname token): [athlete keys]}
+    def build(self):
+        self.index = {}
+        for key in self.athletes:
+            name = key.split(",", 1)[0]
+            block = key[len(name) :]
+            words = name.split(" ")
+            for token in set(words[1:]):
+                self.index.setdefault((block, words[0], token), []).append(key)
+
+    # returns the matching athlete key, None if there is none
+    def find(self, key: str) -> str | None:
+        name = key.split(",", 1)[0]
+        block = key[len(name) :]
+        split_name = name.split(" ")
+        tokens = split_surname_tokens(split_name)
+        if len(tokens) <= 1:
+            return key if key in self.athletes else None
+
+        if len(tokens) <= self.PROBED_SURNAME_TOKENS:
+            for permutation in permutations_all_lengths(tokens):
+                match = " ".join([split_name[0]] + permutation) + block
+                if match in self.athletes:
+                    return match
+            return None
+
+        if self.index is None:
+            self.build()
+
+        # a key matches if it has the same first name and noc and its surnames are some of the tokens in any order,
+        # the permutations are generated in order of the token positions so the key with the smallest positions wins
+        positions = {}
+        for i, token in enumerate(tokens):
+            positions.setdefault(token, []).append(i)
+
+        candidates = set()
+        for token in positions:
+            candidates.update(self.index.get((block, split_name[0], token), ()))
+
+        best = None
+        best_order = None
+        for candidate in candidates:
+            order = []
+            used = {}
+            for word in candidate[: len(candidate) - len(block)].split(" ")[1:]:
+                count = used.get(word, 0)
+                if count >= len(positions.get(word, ())):
+                    break
+                used[word] = count + 1
+                order.append(positions[word][count])
+            else:
+                if best_order is None or order < best_order:
+                    best, best_order = candidate, order
+        return best
+
+
+# padded character trigrams of a normalized name ("ana" -> "  a", " an", "ana", "na ")
+def name_trigrams(name: str) -> frozenset:
+    name = f"  {normalize_name(name).lower()} "
+    return frozenset(name[i : i + 3] for i in range(len(name) - 2))
+
+
+# similarity based matching of athletes that the exact keys miss (ie transliteration variants of a name)
+# athletes are blocked by noc, sex and birth year, inside a block every trigram points to the athletes that have it
+# so only the athletes sharing a trigram with the name are scored (trigram jaccard similarity)
+# the trigrams of a block are only indexed the first time the block is searched
+class FuzzyAthleteIndex:
+    def __init__(self, athletes: dict, threshold: float):
+        self.threshold = threshold
+        self.members = {}  # {(noc, sex, birth year): [athlete]}, in the order the athletes were added
+        self.blocks = {}  # {(noc, sex, birth year): {trigram: [entry number]}}
+        self.entries = []  # [(trigrams, athlete)]
+        for athlete in athletes.values():
+            self.add(athlete)
+
+    # athletes without a noc, sex or birth year are not blocked (and never matched)
+    @staticmethod
+    def block_key(noc: str, sex: str, born: str) -> tuple | None:
+        year = born[-4:]
+        if not noc or not sex or not year.isdigit():
+            return None
+        return noc.upper(), sex[0].upper(), year
+
+    def add(self, athlete):
+        block_key = self.block_key(
+            athlete.get("country_noc", ""), athlete.get("sex", ""), athlete.get("born", "")
+        )
+        if block_key is None:
+            return
+        self.members.setdefault(block_key, []).append(athlete)
+        if block_key in self.blocks:
+            self.index_athlete(self.blocks[block_key], athlete)
+
+    def index_athlete(self, block: dict, athlete):
+        trigrams = name_trigrams(athlete.get("name", ""))
+        entry = len(self.entries)
+        self.entries.append((trigrams, athlete))
+        for trigram in trigrams:
+            block.setdefault(trigram, []).append(entry)
+
+    def get_block(self, block_key: tuple) -> dict:
+        block = self.blocks.get(block_key)
+        if block is None:
+            block = self.blocks[block_key] = {}
+            for athlete in self.members.get(block_key, ()):
+                self.index_athlete(block, athlete)
+        return block
+
+    # returns the most similar athlete with a similarity of at least the threshold, None if there is none
+    # (ties go to the athlete added first)
+    def find(self, name: str, noc: str, sex: str, born: str):
+        block_key = self.block_key(noc, sex, born)
+        if block_key is None or block_key not in self.members:
+            return None
+        block = self.get_block(block_key)
+
+        trigrams = name_trigrams(name)
+        shared = {}
+        for trigram in trigrams:
+            for entry in block.get(trigram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+
+        best = None
+        best_score = self.threshold
+        for entry in sorted(shared):
+            count = shared[entry]
+            score = count / (len(trigrams) + len(self.entries[entry][0]) - count)
+            if score > best_score or (best is None and score >= best_score):
+                best, best_score = entry, score
+        return self.entries[best][1] if best is not None else None
+
+
+# a python list of quoted strings as written in the paris csv files ("['Archery', 'Athletics']"),
+# strings with escapes or anything else are left to ast.literal_eval
+QUOTED_STRING = r"""(?:'[^'\\\r\n\x00]*'|"[^"\\\r\n\x00]*")"""
+LIST_VALUE = re.compile(
+    rf"\[[ \t]*(?:{QUOTED_STRING}[ \t]*,[ \t]*)*(?:{QUOTED_STRING}[ \t]*)?\]"
+)
+LIST_ITEM = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+
+
+# parses the list values of the paris files (ie athletes_codes, events, disciplines) into a tuple
+# the values repeat a lot, the parsed tuples are memoized and shared
+@lru_cache(maxsize=constants.LIST_VALUE_CACHE_SIZE)
+def parse_list_value(value: str) -> tuple:
+    if LIST_VALUE.fullmatch(value):
+        return tuple(single or double for single, double in LIST_ITEM.findall(value))
+    return tuple(ast.literal_eval(value))
+
+
+# same as parse_list_value, but a value that is not a valid python literal ("[Men's 100m]") is read as
+# a list with one string
+@lru_cache(maxsize=constants.LIST_VALUE_CACHE_SIZE)
+def parse_list_value_lenient(value: str) -> tuple:
+    if LIST_VALUE.fullmatch(value):
+        return parse_list_value(value)
+    try:
+        parsed = ast.literal_eval(value)
+    except Exception:
+        value = value.replace("[", "").replace("]", "")
+        return parse_list_value(f'["{value}"]')
+    return tuple(parsed)
@@ -0,0 +1,176 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import utils
+
+# rule engine behind jobs.validate_paris_consistency
+# every rule looks at one paris medallist row and returns the offending value, None if the row passes.
+# Rows are checked in chunks (in worker processes when there are several chunks and workers),
+# the issues of a rule are only counted, with the first few offending values kept as a sample
+
+
+# the lookups the rules need: column indices of the medallist rows and the known athlete codes / events / nocs
+# (plain data, it is sent to the worker processes)
+class ValidationContext:
+    def __init__(self, medallist_schema, athlete_codes: set, events: set, noc_registry):
+        self.athlete_code_idx = medallist_schema.index("code_athlete")
+        self.event_idx = medallist_schema.index("event")
+        self.gender_idx = medallist_schema.index("gender")
+        self.noc_idx = medallist_schema.index("nationality_code")
+        self.birth_date_idx = medallist_schema.index("birth_date")
+        self.athlete_codes = athlete_codes
+        self.events = events
+        self.noc_registry = noc_registry
+
+
+def missing_athlete(row: list[str], context: ValidationContext):
+    code = row[context.athlete_code_idx]
+    return code if code not in context.athlete_codes else None
+
+
+def missing_event(row: list[str], context: ValidationContext):
+    event = row[context.event_idx]
+    return event if event not in context.events else None
+
+
+def invalid_gender(row: list[str], context: ValidationContext):
+    gender = row[context.gender_idx]
+    return gender if gender.upper() not in ("MALE", "FEMALE") else None
+
+
+def invalid_noc(row: list[str], context: ValidationContext):
+    noc = row[context.noc_idx].upper()
+    return noc if noc != "" and noc not in context.noc_registry else None
+
+
+# rows without a nationality code are not date checked (the validation always skipped them)
+def invalid_birth_date(row: list[str], context: ValidationContext):
+    if row[context.noc_idx] == "":
+        return None
+    dob = row[context.birth_date_idx]
+    # same check as utils.normalize_date(dob) == "", without its "invalid date" message
+    return dob if not utils.parse_date(dob.strip()) else None
+
+
+# {report name: rule}, in the order the reports are printed
+RULES = {
+    "missing_athletes": missing_athlete,
+    "missing_events": missing_event,
+    "invalid_gender": invalid_gender,
+    "invalid_noc": invalid_noc,
+    "invalid_dob": invalid_birth_date,
+}
+
+
+# number of issues of a rule and the first sample_size offending values
+class IssueCounter:
+    __slots__ = ("count", "sample", "sample_size")
+
+    def __init__(self, sample_size: int, count: int = 0, sample: list | None = None):
+        self.count = count
+        self.sample = sample if sample is not None else []
+        self.sample_size = sample_size
+
+    def add(self, value):
+        self.count += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(value)
+
+    # adds the issues of the rows that come after this counter's rows
+    def merge(self, other: "IssueCounter"):
+        self.count += other.count
+        self.sample.extend(other.sample[: self.sample_size - len(self.sample)])
+
+
+# issue counters of every rule
+class ValidationReport:
+    def __init__(self, rule_names, sample_size: int):
+        self.sample_size = sample_size
+        self.issues = {name: IssueCounter(sample_size) for name in rule_names}
+
+    def __getitem__(self, name: str) -> IssueCounter:
+        return self.issues[name]
+
+    def items(self):
+        return self.issues.items()
+
+    def merge(self, other: "ValidationReport"):
+        for name, counter in other.items():
+            self.issues[name].merge(counter)
+
+    def print_summary(self):
+        for name, counter in self.issues.items():
+            if counter.count:
+                print(f"Validation Report - {name}: {counter.count} issues found.")
+                if name == "invalid_noc":
+                    print("Invalid NOCs:", counter.sample)
+
+    # plain data for the validation manifest (marshal)
+    def to_data(self) -> dict:
+        return {name: (counter.count, counter.sample) for name, counter in self.issues.items()}
+
+    @classmethod
+    def from_data(cls, data: dict, sample_size: int) -> "ValidationReport":
+        report = cls(data, sample_size)
+        for name, (count, sample) in data.items():
+            report.issues[name] = IssueCounter(sample_size, count, list(sample))
+        return report
+
+
+# checks a chunk of rows against every rule
+def validate_rows(rows, context: ValidationContext, rules: dict, sample_size: int) -> ValidationReport:
+    report = ValidationReport(rules, sample_size)
+    checks = [(rule, report.issues[name]) for name, rule in rules.items()]
+    for row in rows:
+        for rule, counter in checks:
+            value = rule(row, context)
+            if value is not None:
+                counter.add(value)
+    return report
+
+
+# context of the worker processes, set once per worker instead of being sent with every chunk
+worker_context = None
+
+
+def set_worker_context(context: ValidationContext):
+    global worker_context
+    worker_context = context
+
+
+def validate_worker_chunk(rows, rules: dict, sample_size: int) -> ValidationReport:
+    return validate_rows(rows, worker_context, rules, sample_size)
+
+
+# checks the rows in chunks of chunk_size, with workers > 1 the chunks are checked in that many processes
+# the chunk reports are merged in row order, so the samples are the same for any number of workers
+def run_rules(
+    rows: list,
+    context: ValidationContext,
+    rules: dict | None = None,
+    sample_size: int = 10,
+    chunk_size: int = 4096,
+    workers: int = 1,
+) -> ValidationReport:
+    if rules is None:
+        rules = RULES
+    report = ValidationReport(rules, sample_size)
+    rows = iter(rows)
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+
+    if workers > 1:
+        chunks = list(chunks)
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            report.merge(validate_rows(chunk, context, rules, sample_size))
+        return report
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=set_worker_context, initargs=(context,)
+    ) as pool:
+        futures = [
+            pool.submit(validate_worker_chunk, chunk, rules, sample_size) for chunk in chunks
+        ]
+        for future in futures:
+            report.merge(future.result())
+    return report